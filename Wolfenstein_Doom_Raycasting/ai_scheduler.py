@@ -0,0 +1,51 @@
+import math
+import time
+from settings import *
+
+
+class AIScheduler:
+    # runs npc logic within a time budget: npc near or in sight every frame,
+    # the rest at reduced rates, least recently updated first
+    def __init__(self, game):
+        self.game = game
+        self.frame = 0
+        self.updated = 0
+        self.deferred = 0
+        self.time_budget = AI_TIME_BUDGET  # None updates every due npc, whatever the time
+
+    def get_interval(self, npc):
+        # frames between logic updates
+        if not npc.alive or npc.pain or npc.dist < AI_NEAR_DIST:
+            return 1
+        if npc.on_screen and (npc.ray_cast_value or self.game.player.shot):
+            return 1
+        if npc.dist < AI_FAR_DIST:
+            return AI_MID_INTERVAL
+        return AI_FAR_INTERVAL
+
+    def update(self, npc_list):
+        self.frame += 1
+        self.updated = self.deferred = 0
+        deadline = time.perf_counter() + self.time_budget / 1000 if self.time_budget is not None else math.inf
+        due = []
+        for npc in npc_list:
+            interval = self.get_interval(npc)
+            if interval == 1:
+                self.update_npc(npc)
+            elif self.frame - npc.logic_frame >= interval:
+                due.append(npc)
+            else:
+                self.deferred += 1
+
+        due.sort(key=lambda npc: npc.logic_frame)
+        for i, npc in enumerate(due):
+            if time.perf_counter() > deadline:
+                self.deferred += len(due) - i
+                break
+            self.update_npc(npc)
+
+    def update_npc(self, npc):
+        npc.logic_frames = self.frame - npc.logic_frame
+        npc.update_logic()
+        npc.logic_frame = self.frame
+        self.updated += 1
@@ -0,0 +1,102 @@
+import time
+from collections import deque
+import numpy as np
+from settings import *
+from visibility import *
+from thread_pool import *
+
+
+def get_next_steps(graph, npc_positions, goal, starts):
+    # next tile towards the goal from each start, avoiding tiles taken by npc like PathFinding.bfs;
+    # one reverse bfs from the goal serves every start
+    distance = {goal: 0}
+    queue = deque([goal])
+    while queue:
+        cur_node = queue.popleft()
+        next_dist = distance[cur_node] + 1
+        for next_node in graph.get(cur_node, []):
+            if next_node not in distance and next_node not in npc_positions:
+                distance[next_node] = next_dist
+                queue.append(next_node)
+
+    steps = []
+    for start in starts:
+        nodes = [node for node in graph.get(start, []) if node in distance]
+        steps.append(min(nodes, key=distance.get) if start != goal and nodes else goal)
+    return steps
+
+
+def run_ai_job(graph, grid, npc_positions, player_pos, paths, npc_pos):
+    # everything passed in is immutable or never written after the game starts
+    steps = [None] * len(paths)
+    for goal in {goal for start, goal in paths}:
+        indices = [i for i, path in enumerate(paths) if path[1] == goal]
+        next_steps = get_next_steps(graph, npc_positions, goal, [paths[i][0] for i in indices])
+        for i, step in zip(indices, next_steps):
+            steps[i] = step
+    visible = []
+    if npc_pos:
+        tx, ty = np.array(npc_pos).T
+        ox, oy = np.full(len(tx), player_pos[0]), np.full(len(tx), player_pos[1])
+        visible = cast_player_npc_rays(grid, ox, oy, tx, ty).tolist()
+    return steps, visible
+
+
+class AIWorker:
+    # npc queue path and line of sight queries during the frame, they are answered in one batch
+    # on the worker pool and read back on a later frame; the main loop never waits for them
+    def __init__(self, game):
+        self.game = game
+        self.path_queries = {}
+        self.visibility_queries = {}
+        self.next_steps = {}
+        self.visibility = {}
+        self.pending = deque()
+        self.jobs_done = 0
+        self.latencies = deque(maxlen=AI_LATENCY_SAMPLES)
+
+    def get_path(self, npc, start, goal):
+        # last known next tile for the npc, None until the first answer arrives
+        self.path_queries[npc] = start, goal
+        return self.next_steps.get(npc)
+
+    def get_visibility(self, npc):
+        self.visibility_queries[npc] = npc.x, npc.y
+        return self.visibility.get(npc, False)
+
+    @property
+    def queue_depth(self):
+        return len(self.pending)
+
+    @property
+    def latency(self):
+        # average ms from submitting a job to applying its results
+        return 1000 * sum(self.latencies) / len(self.latencies) if self.latencies else 0
+
+    def update(self):
+        self.apply_results()
+        self.submit()
+
+    def apply_results(self):
+        # results are applied in submission order so newer answers always win
+        while self.pending and self.pending[0][0].done():
+            future, submit_time, path_npc, visibility_npc = self.pending.popleft()
+            steps, visible = future.result()
+            self.next_steps.update(zip(path_npc, steps))
+            self.visibility.update(zip(visibility_npc, visible))
+            self.latencies.append(time.perf_counter() - submit_time)
+            self.jobs_done += 1
+
+    def submit(self):
+        if not (self.path_queries or self.visibility_queries) or len(self.pending) >= AI_MAX_PENDING:
+            # queries stay queued and are replaced by newer ones until the pool catches up
+            return
+        player = self.game.player
+        path_npc, paths = tuple(self.path_queries), tuple(self.path_queries.values())
+        visibility_npc, npc_pos = tuple(self.visibility_queries), tuple(self.visibility_queries.values())
+        future = get_thread_pool('ai', AI_WORKERS).submit(
+            run_ai_job, self.game.pathfinding.graph, self.game.map.grid_array,
+            self.game.object_handler.occupancy.get_positions(), player.pos, paths, npc_pos
+        )
+        self.pending.append((future, time.perf_counter(), path_npc, visibility_npc))
+        self.path_queries, self.visibility_queries = {}, {}
@@ -0,0 +1,70 @@
+import pygame as pg
+from assets import *
+
+# every animation clip of the process as an immutable tuple of frames, referred to by index
+clips = []
+clip_ids = {}
+
+
+def get_clip(key, factory=None):
+    # clip of the animation directory key, or of the frames factory builds for key
+    clip = clip_ids.get(key)
+    if clip is None:
+        clip = clip_ids[key] = len(clips)
+        clips.append(assets.get(key, lambda: tuple(factory())) if factory else assets.get_images(key))
+    return clip
+
+
+class AnimationClock:
+    # the time all animations switch frames by, read once per frame; every cursor that is due
+    # moves on to its next frame in the same pass
+    def __init__(self):
+        self.time = pg.time.get_ticks()
+        # cursors the clock moves on, with their animation times
+        self.cursors = {}
+
+    def add(self, cursor, animation_time):
+        self.cursors[cursor] = animation_time
+        return cursor
+
+    def remove(self, cursor):
+        self.cursors.pop(cursor, None)
+
+    def update(self):
+        self.time = pg.time.get_ticks()
+        self.advance()
+
+    def advance(self):
+        time_now = self.time
+        for cursor, animation_time in self.cursors.items():
+            if time_now > cursor.next_time:
+                cursor.next_time = time_now + animation_time
+                cursor.frame = (cursor.frame + 1) % len(clips[cursor.clip])
+
+
+class AnimationCursor:
+    # where one object is in the shared clips, moved on by the clock while it holds the cursor
+    __slots__ = 'clip', 'frame', 'next_time'
+
+    def __init__(self, clip, next_time):
+        self.clip = clip
+        self.frame = 0
+        self.next_time = next_time
+
+    def play(self, clip):
+        # other clips start from their first frame, like a fresh deque
+        if clip != self.clip:
+            self.clip = clip
+            self.frame = 0
+
+    def advance_once(self, clip):
+        # next frame of a clip that stops on its last frame, None once it is there
+        self.play(clip)
+        if self.frame < len(clips[clip]) - 1:
+            self.frame += 1
+            return clips[clip][self.frame]
+        return None
+
+    @property
+    def image(self):
+        return clips[self.clip][self.frame]
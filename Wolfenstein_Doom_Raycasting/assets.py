@@ -0,0 +1,179 @@
+import io
+import json
+import mmap
+import os
+import struct
+import numpy as np
+import pygame as pg
+from settings import *
+
+ARCHIVE_MAGIC = b'WDRPAK01'
+
+
+def get_image_files(path):
+    # files of an animation directory in the order SpriteObject.get_images always used
+    return [path + '/' + file_name for file_name in os.listdir(path) if os.path.isfile(os.path.join(path, file_name))]
+
+
+class AssetArchive:
+    # memory-mapped archive written by build_assets.py: magic, index length, json index, data with
+    # offsets from the end of the index; images are raw RGBA at the size they are used at, sounds
+    # raw samples in the mixer format
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buffer[:8] != ARCHIVE_MAGIC:
+            raise ValueError(f'{path} is not an asset archive')
+        index_size, = struct.unpack_from('<Q', self.buffer, 8)
+        index = json.loads(self.buffer[16:16 + index_size])
+        self.images = {(entry['path'], entry['res'] and tuple(entry['res'])): entry for entry in index['images']}
+        self.image_dirs = index['image_dirs']
+        self.sounds = index['sounds']
+        self.mixer = tuple(index['mixer'])
+        self.files = index['files']
+        self.data_start = 16 + index_size
+
+    def get_data(self, entry):
+        offset = self.data_start + entry['offset']
+        return memoryview(self.buffer)[offset:offset + entry['size']]
+
+    def get_image(self, path, res):
+        entry = self.images.get((path, res))
+        if entry is None:
+            return None
+        return pg.image.frombuffer(self.get_data(entry), entry['image_size'], 'RGBA')
+
+    def get_sound(self, path):
+        entry = self.sounds.get(path)
+        if entry is None or pg.mixer.get_init() != self.mixer:
+            return None
+        return pg.mixer.Sound(buffer=self.get_data(entry))
+
+    def get_file(self, path):
+        entry = self.files.get(path)
+        return None if entry is None else io.BytesIO(self.get_data(entry))
+
+
+class AssetRegistry:
+    # images, animation frames, sounds and data derived from them are loaded once per process
+    # and shared by every game, sprite and npc; nothing handed out may be drawn on.
+    # Assets found in the archive are created from its mapped buffer instead of loose files
+    def __init__(self, archive_path=ASSET_ARCHIVE):
+        self.images = {}
+        self.image_dirs = {}
+        self.sounds = {}
+        self.music = set()
+        self.derived = {}
+        self.preloaded = set()
+        self.archive = AssetArchive(archive_path) if archive_path and os.path.isfile(archive_path) else None
+
+    def get_image(self, path, res=None):
+        key = path, None if res is None else tuple(res)
+        self.preloaded.discard(key)
+        image = self.images.get(key)
+        if image is None:
+            image = self.archive and self.archive.get_image(*key)
+            if image is not None:
+                image = image.convert_alpha()
+            else:
+                image = self.images.get((path, None))
+                if image is None:
+                    image = pg.image.load(path).convert_alpha()
+                if res is not None:
+                    image = pg.transform.scale(image, res)
+            self.images[key] = image
+        return image
+
+    def decode_image(self, path, res=None):
+        # the slow half of get_image, safe on other threads: pixels not yet in the display format;
+        # res must be None unless the archive has the image at that size
+        image = self.archive and self.archive.get_image(path, res)
+        return pg.image.load(path) if image is None else image
+
+    def add_image(self, path, res, image):
+        # the other half, on the main thread since the display format belongs to it
+        self.images[path, res] = image.convert_alpha()
+        self.preloaded.add((path, res))
+
+    def drop_preloaded(self):
+        # preloaded images nothing asked for, like originals that were only scaled from
+        for key in self.preloaded:
+            del self.images[key]
+        self.preloaded.clear()
+
+    def get_images(self, path):
+        images = self.image_dirs.get(path)
+        if images is None:
+            files = self.archive and self.archive.image_dirs.get(path)
+            images = self.image_dirs[path] = tuple(self.get_image(file) for file in files or get_image_files(path))
+        return images
+
+    def get_sound(self, path):
+        sound = self.sounds.get(path)
+        if sound is None:
+            sound = self.sounds[path] = self.load_sound(path)
+        return sound
+
+    def load_sound(self, path):
+        # safe on other threads, the caller stores the sound
+        sound = self.archive and self.archive.get_sound(path)
+        return pg.mixer.Sound(path) if sound is None else sound
+
+    def load_music(self, path):
+        # music is streamed by the mixer, from the archive's copy when there is one
+        self.music.add(path)
+        file = self.archive and self.archive.get_file(path)
+        if file is None:
+            return pg.mixer.music.load(path)
+        return pg.mixer.music.load(file, os.path.splitext(path)[1][1:])
+
+    def get(self, key, factory):
+        # anything built from the assets above, like pre-sliced or rescaled textures
+        value = self.derived.get(key)
+        if value is None:
+            value = self.derived[key] = factory()
+        return value
+
+    def clear(self):
+        self.images.clear()
+        self.preloaded.clear()
+        self.image_dirs.clear()
+        self.sounds.clear()
+        self.derived.clear()
+
+    @classmethod
+    def get_size(cls, asset):
+        if isinstance(asset, pg.Surface):
+            # subsurfaces share their parent's pixels
+            return 0 if asset.get_parent() else asset.get_pitch() * asset.get_height()
+        if isinstance(asset, pg.mixer.Sound):
+            frequency, size, channels = pg.mixer.get_init()
+            return int(asset.get_length() * frequency) * abs(size) // 8 * channels
+        if isinstance(asset, np.ndarray):
+            return asset.nbytes
+        if isinstance(asset, dict):
+            return sum(cls.get_size(value) for value in asset.values())
+        if isinstance(asset, (list, tuple)):
+            return sum(cls.get_size(value) for value in asset)
+        return 0
+
+    def get_footprint(self):
+        # bytes held per kind of asset; animation frames are counted with the images
+        return {
+            'images': self.get_size(self.images),
+            'sounds': self.get_size(self.sounds),
+            'derived': self.get_size(self.derived),
+        }
+
+    def get_report(self):
+        footprint = self.get_footprint()
+        lines = [f'{kind:<8} {size / 2 ** 20:8.1f} MB' for kind, size in footprint.items()]
+        lines.append(f'{"total":<8} {sum(footprint.values()) / 2 ** 20:8.1f} MB')
+        if self.archive:
+            lines.append(f'{"mapped":<8} {len(self.archive.buffer) / 2 ** 20:8.1f} MB')
+        lines.append(f'{len(self.images)} images, {len(self.image_dirs)} animations, '
+                     f'{len(self.sounds)} sounds, {len(self.derived)} derived')
+        return '\n'.join(lines)
+
+
+assets = AssetRegistry()
@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+from assets import *
+
+
+def load_all(registry, archive):
+    # every asset the archive holds, loaded through the registry like the game does
+    for path, res in archive.images:
+        registry.get_image(path, res)
+    for path in archive.image_dirs:
+        registry.get_images(path)
+    for path in archive.sounds:
+        registry.get_sound(path)
+    for path in archive.files:
+        registry.load_music(path)
+
+
+def run(repeat=5, archive_path=ASSET_ARCHIVE):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pg.init()
+    pg.display.set_mode(RES)
+    archive = AssetArchive(archive_path)
+
+    results = {}
+    for name, path in ('loose', None), ('archive', archive_path):
+        times = []
+        for _ in range(repeat):
+            time_start = time.perf_counter()
+            load_all(AssetRegistry(path), archive)
+            times.append(time.perf_counter() - time_start)
+        results[name] = min(times)
+
+    print(f'{len(archive.images)} images, {len(archive.image_dirs)} animations, '
+          f'{len(archive.sounds) + len(archive.files)} sounds, best of {repeat}')
+    print(f'{"source":<10}{"startup ms":>12}')
+    for name, startup in results.items():
+        print(f'{name:<10}{startup * 1000:>12.1f}')
+
+
+if __name__ == '__main__':
+    run(*map(int, sys.argv[1:2]))
@@ -0,0 +1,58 @@
+import random
+import sys
+import time
+from types import SimpleNamespace
+from map import Map
+from pathfinding import PathFinding
+from hierarchical_pathfinding import HierarchicalPathFinding
+
+
+def make_map(size, seed):
+    rng = random.Random(seed)
+    mini_map = [[1] * size] + [[1] + [False] * (size - 2) + [1] for _ in range(size - 2)] + [[1] * size]
+    for _ in range(size * size // 30):
+        x, y = rng.randrange(1, size - 1), rng.randrange(1, size - 1)
+        w, h = rng.choice([(1, rng.randint(2, 8)), (rng.randint(2, 8), 1), (2, 2)])
+        for j in range(y, min(y + h, size - 1)):
+            for i in range(x, min(x + w, size - 1)):
+                mini_map[j][i] = rng.randint(1, 5)
+    return mini_map
+
+
+def get_queries(game_map, count, seed):
+    rng = random.Random(seed)
+    open_tiles = [(x, y) for y in range(game_map.rows) for x in range(game_map.cols) if not game_map.get_tile(x, y)]
+    return [(rng.choice(open_tiles), rng.choice(open_tiles)) for _ in range(count)]
+
+
+def run(size=256, count=200, seed=0):
+    game = SimpleNamespace(object_handler=SimpleNamespace(occupancy=set()))
+    game.map = Map(game, make_map(size, seed))
+    queries = get_queries(game.map, count, seed)
+
+    time_start = time.perf_counter()
+    pathfinding = PathFinding(game)
+    bfs_build = time.perf_counter() - time_start
+    time_start = time.perf_counter()
+    bfs_nodes = 0
+    for start, goal in queries:
+        pathfinding.get_path_bfs(start, goal)
+        bfs_nodes += len(pathfinding.visited)
+    bfs_time = time.perf_counter() - time_start
+
+    time_start = time.perf_counter()
+    hpa = HierarchicalPathFinding(game.map)
+    hpa_build = time.perf_counter() - time_start
+    time_start = time.perf_counter()
+    for start, goal in queries:
+        hpa.get_path(start, goal)
+    hpa_time = time.perf_counter() - time_start
+
+    print(f'map {size}x{size}, {count} queries, {len(hpa.abstract_graph)} abstract nodes')
+    print(f'{"engine":<8}{"build ms":>12}{"ms/query":>12}{"nodes/query":>14}')
+    print(f'{"bfs":<8}{bfs_build * 1000:>12.1f}{bfs_time / count * 1000:>12.3f}{bfs_nodes / count:>14.1f}')
+    print(f'{"hpa":<8}{hpa_build * 1000:>12.1f}{hpa_time / count * 1000:>12.3f}{hpa.nodes_expanded / count:>14.1f}')
+
+
+if __name__ == '__main__':
+    run(*map(int, sys.argv[1:]))
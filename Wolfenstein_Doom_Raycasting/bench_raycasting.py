@@ -0,0 +1,56 @@
+import math
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+from settings import *
+
+
+def get_view(num_rays):
+    # the projection values View derives, for ray counts past the window's
+    return SimpleNamespace(num_rays=num_rays, delta_angle=FOV / num_rays,
+                           screen_dist=num_rays * SCALE // 2 / math.tan(HALF_FOV))
+
+
+def get_poses(game_map, count, seed):
+    rng = random.Random(seed)
+    open_tiles = [(x, y) for y in range(game_map.rows) for x in range(game_map.cols) if not game_map.get_tile(x, y)]
+    return [(x + rng.random(), y + rng.random(), rng.uniform(0, math.tau))
+            for x, y in (rng.choice(open_tiles) for _ in range(count))]
+
+
+def run(frames=200, seed=0, *worker_counts):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import main
+    game = main.Game()
+    raycasting, player = game.raycasting, game.player
+    poses = get_poses(game.map, frames, seed)
+    worker_counts = worker_counts or (0, 4, 8, 16)
+
+    print(f'{frames} frames, {os.cpu_count()} cpus, numpy engine')
+    print(f'{"rays":>6}{"workers":>9}{"ms/frame":>10}{"speedup":>9}')
+    for num_rays in NUM_RAYS, NUM_RAYS * 4:
+        raycasting.view = get_view(num_rays)
+        raycasting.resize()
+        serial_time, serial_result = None, None
+        for workers in worker_counts:
+            raycasting.workers = workers
+            results = []
+            time_start = time.perf_counter()
+            for player.x, player.y, player.angle in poses:
+                raycasting.ray_cast_numpy()
+                results.append(raycasting.ray_casting_arrays)
+            frame_time = (time.perf_counter() - time_start) / frames
+            if serial_time is None:
+                serial_time, serial_result = frame_time, results
+            # bands merge into the same per ray buffers the single pass fills
+            assert all(np.array_equal(a, b) for result, serial in zip(results, serial_result)
+                       for a, b in zip(result, serial))
+            print(f'{num_rays:>6}{workers:>9}{frame_time * 1000:>10.2f}{serial_time / frame_time:>9.2f}')
+
+
+if __name__ == '__main__':
+    run(*map(int, sys.argv[1:]))
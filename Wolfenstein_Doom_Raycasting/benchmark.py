@@ -0,0 +1,140 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+from main import *
+# after the star import, the game modules import names like random and time themselves
+import json
+import random
+import sys
+import time
+import numpy as np
+
+DELTA_TIME = 16
+GLOBAL_EVENT_TIME = 40
+TIMED = 'player.update', 'raycasting.update', 'object_handler.update', 'object_renderer.draw'
+
+# (frames, keys held, mouse x movement, fire), played in a loop
+INPUT_SCRIPT = [
+    (90, 'w', 0, False),
+    (30, '', 25, False),
+    (60, 'wd', 0, True),
+    (45, '', -30, False),
+    (90, 'w', 5, True),
+    (30, 's', 0, False),
+    (60, 'a', 15, True),
+    (45, '', 40, False),
+]
+KEYS = {'w': pg.K_w, 's': pg.K_s, 'a': pg.K_a, 'd': pg.K_d}
+
+
+class ScriptedClock(AnimationClock):
+    # game time advances by exactly DELTA_TIME a frame
+    def __init__(self):
+        super().__init__()
+        self.time = 0
+
+    def update(self):
+        self.time += DELTA_TIME
+        self.advance()
+
+
+class BenchmarkGame(Game):
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.frame = 0
+        self.script = [step for frames, *step in INPUT_SCRIPT for _ in range(frames)]
+        self.timings = {name: [] for name in TIMED}
+        self.frame_times = []
+        super().__init__()
+        # the render scale would follow the machine's frame times, every run draws at RENDER_SCALE
+        self.resolution_controller = None
+        self.set_render_scale(RENDER_SCALE)
+        # a second game on the scripted clock, the first one only loaded the assets
+        self.animation_clock = ScriptedClock()
+        self.new_game()
+
+    def new_game(self):
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+        super().new_game()
+        self.player.check_game_over = self.keep_player_alive
+        self.object_handler.check_win = lambda: None
+        # which npc fit the scheduler's time budget depends on the machine, every due one runs instead
+        if self.object_handler.ai_scheduler:
+            self.object_handler.ai_scheduler.time_budget = None
+        # npc line of sight would switch from the exact ray to the pvs whenever its build finishes
+        if self.object_handler.pvs and self.object_handler.pvs.future:
+            self.object_handler.pvs.future.result()
+        for name in TIMED:
+            obj_name, method = name.split('.')
+            obj = getattr(self, obj_name)
+            setattr(obj, method, self.timed(self.timings[name], getattr(obj, method)))
+
+    @staticmethod
+    def timed(times, func):
+        def wrapper(*args, **kwargs):
+            time_start = time.perf_counter()
+            result = func(*args, **kwargs)
+            times.append(time.perf_counter() - time_start)
+            return result
+        return wrapper
+
+    def keep_player_alive(self):
+        # game over would wait 1.5 s and restart, the run goes on at full health instead
+        if self.player.health < 1:
+            self.player.health = PLAYER_MAX_HEALTH
+
+    def tick(self):
+        self.clock.tick()
+        return DELTA_TIME
+
+    def get_keys(self):
+        keys = self.script[self.frame % len(self.script)][0]
+        return {key: key_name in keys for key_name, key in KEYS.items()}
+
+    def get_mouse_pos(self):
+        return HALF_WIDTH, HALF_HEIGHT
+
+    def get_mouse_rel(self):
+        return self.script[self.frame % len(self.script)][1], 0
+
+    def check_events(self):
+        pg.event.pump()
+        pg.event.clear()
+        time_now = self.frame * DELTA_TIME
+        self.global_trigger = time_now // GLOBAL_EVENT_TIME != (time_now - DELTA_TIME) // GLOBAL_EVENT_TIME
+        if self.script[self.frame % len(self.script)][2]:
+            self.player.single_fire_event(pg.event.Event(pg.MOUSEBUTTONDOWN, button=1))
+
+    def run(self, frames):
+        for self.frame in range(frames):
+            time_start = time.perf_counter()
+            self.check_events()
+            self.update()
+            self.draw()
+            self.frame_times.append(time.perf_counter() - time_start)
+
+
+def get_percentiles(times):
+    times_ms = np.array(times) * 1000
+    p50, p95, p99 = np.percentile(times_ms, [50, 95, 99])
+    return {'p50': round(p50, 3), 'p95': round(p95, 3), 'p99': round(p99, 3),
+            'mean': round(times_ms.mean(), 3), 'samples': len(times_ms)}
+
+
+def run(frames=600, seed=0, warmup=30):
+    game = BenchmarkGame(seed)
+    game.run(warmup + frames)
+    report = {'frames': frames, 'seed': seed, 'delta_time': DELTA_TIME, 'res': RES,
+              'timings_ms': {name: get_percentiles(times[warmup:]) for name, times in game.timings.items()},
+              'frame_ms': get_percentiles(game.frame_times[warmup:]),
+              # the same seed and script end in the same state, a different one means the run diverged
+              'final_state': {'player': [round(game.player.x, 4), round(game.player.y, 4), game.player.health],
+                              'npcs_alive': game.object_handler.occupancy.npc_count}}
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == '__main__':
+    run(*map(int, sys.argv[1:4]))
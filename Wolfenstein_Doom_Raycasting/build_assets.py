@@ -0,0 +1,61 @@
+import json
+import os
+import struct
+import sys
+from assets import *
+
+
+def collect_assets():
+    # everything a game asks for, found by starting one, plus the frames of every sprite directory
+    # so npc types the random spawn skipped are packed too
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    assets.archive = None
+    import main
+    # only what the game asks for, the loader would also preload every loose file
+    main.ASYNC_LOADING = False
+    main.Game()
+    for dir_path, dir_names, file_names in os.walk('resources/sprites'):
+        if any(file_name.endswith('.png') for file_name in file_names):
+            assets.get_images(dir_path.replace(os.sep, '/'))
+    return assets
+
+
+def write_archive(registry, path=ASSET_ARCHIVE):
+    index = {'images': [], 'image_dirs': {}, 'sounds': {}, 'mixer': pg.mixer.get_init(), 'files': {}}
+    chunks = []
+    offset = 0
+
+    def add_chunk(data):
+        nonlocal offset
+        entry = {'offset': offset, 'size': len(data)}
+        chunks.append(data)
+        offset += len(data)
+        return entry
+
+    for (image_path, res), image in registry.images.items():
+        entry = add_chunk(pg.image.tobytes(image, 'RGBA'))
+        entry.update(path=image_path, res=res, image_size=image.get_size())
+        index['images'].append(entry)
+    for dir_path in registry.image_dirs:
+        index['image_dirs'][dir_path] = get_image_files(dir_path)
+    for sound_path, sound in registry.sounds.items():
+        index['sounds'][sound_path] = add_chunk(sound.get_raw())
+    for music_path in registry.music:
+        with open(music_path, 'rb') as file:
+            index['files'][music_path] = add_chunk(file.read())
+
+    index_data = json.dumps(index).encode()
+    with open(path, 'wb') as file:
+        file.write(ARCHIVE_MAGIC)
+        file.write(struct.pack('<Q', len(index_data)))
+        file.write(index_data)
+        for chunk in chunks:
+            file.write(chunk)
+    return 16 + len(index_data) + offset
+
+
+if __name__ == '__main__':
+    archive_path = sys.argv[1] if len(sys.argv) > 1 else ASSET_ARCHIVE
+    size = write_archive(collect_assets(), archive_path)
+    print(f'{archive_path}: {size / 2 ** 20:.1f} MB')
@@ -0,0 +1,170 @@
+import heapq
+import math
+from settings import *
+
+SQRT_2 = math.sqrt(2)
+
+
+class HierarchicalPathFinding:
+    def __init__(self, game_map, cluster_size=HPA_CLUSTER_SIZE):
+        self.map = game_map
+        self.cluster_size = cluster_size
+        self.ways = ((-1, 0, 1), (0, -1, 1), (1, 0, 1), (0, 1, 1),
+                     (-1, -1, SQRT_2), (1, -1, SQRT_2), (1, 1, SQRT_2), (-1, 1, SQRT_2))
+        self.cluster_nodes = {}
+        self.abstract_graph = {}
+        self.nodes_expanded = 0
+        self.get_entrances()
+        self.get_intra_cluster_edges()
+
+    def get_path(self, start, goal):
+        if start == goal:
+            return goal
+
+        start_cluster = self.get_cluster(start)
+        if start_cluster == self.get_cluster(goal):
+            path = self.find_path(start, goal, self.get_bounds(start_cluster))
+            if path:
+                return path[1]
+
+        abstract_path = self.find_abstract_path(start, goal)
+        if not abstract_path:
+            return goal
+
+        # refine lazily: only the first abstract hop is turned into tiles
+        next_node = abstract_path[1]
+        if max(abs(next_node[0] - start[0]), abs(next_node[1] - start[1])) == 1:
+            return next_node
+        path = self.find_path(start, next_node, self.get_bounds(start_cluster))
+        return path[1] if path else goal
+
+    def get_cluster(self, tile):
+        return tile[0] // self.cluster_size, tile[1] // self.cluster_size
+
+    def get_bounds(self, cluster):
+        x0, y0 = cluster[0] * self.cluster_size, cluster[1] * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.map.cols), min(y0 + self.cluster_size, self.map.rows)
+
+    def is_open(self, tile):
+        x, y = tile
+        return 0 <= x < self.map.cols and 0 <= y < self.map.rows and not self.map.get_tile(x, y)
+
+    @staticmethod
+    def octile(a, b):
+        dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+        return dx + dy + (SQRT_2 - 2) * min(dx, dy)
+
+    def search(self, start, bounds, goal=None):
+        # A* towards goal inside bounds, or Dijkstra over the whole of bounds without one
+        x0, y0, x1, y1 = bounds
+        grid, cols = self.map.grid, self.map.cols
+        dist = {start: 0}
+        came_from = {start: None}
+        heap = [(self.octile(start, goal) if goal else 0, 0, start)]
+
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if cost > dist[node]:
+                continue
+            self.nodes_expanded += 1
+            if node == goal:
+                break
+            x, y = node
+            for dx, dy, step_cost in self.ways:
+                nx, ny = x + dx, y + dy
+                if x0 <= nx < x1 and y0 <= ny < y1 and not grid[ny * cols + nx]:
+                    next_node, next_cost = (nx, ny), cost + step_cost
+                    if next_cost < dist.get(next_node, math.inf):
+                        dist[next_node] = next_cost
+                        came_from[next_node] = node
+                        priority = next_cost + self.octile(next_node, goal) if goal else next_cost
+                        heapq.heappush(heap, (priority, next_cost, next_node))
+        return dist, came_from
+
+    @staticmethod
+    def get_path_from(came_from, goal):
+        if goal not in came_from:
+            return []
+        path = [goal]
+        while came_from[path[-1]] is not None:
+            path.append(came_from[path[-1]])
+        return path[::-1]
+
+    def find_path(self, start, goal, bounds):
+        dist, came_from = self.search(start, bounds, goal)
+        return self.get_path_from(came_from, goal)
+
+    def get_cluster_edges(self, tile):
+        cluster = self.get_cluster(tile)
+        dist, _ = self.search(tile, self.get_bounds(cluster))
+        return {node: dist[node] for node in self.cluster_nodes.get(cluster, ()) if node in dist and node != tile}
+
+    def find_abstract_path(self, start, goal):
+        # start and goal join the abstract graph only for this query
+        start_edges = self.get_cluster_edges(start)
+        start_edges.update(self.abstract_graph.get(start, {}))
+        goal_edges = self.get_cluster_edges(goal)
+
+        dist = {start: 0}
+        came_from = {start: None}
+        heap = [(self.octile(start, goal), 0, start)]
+
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if cost > dist[node]:
+                continue
+            self.nodes_expanded += 1
+            if node == goal:
+                return self.get_path_from(came_from, goal)
+
+            edges = start_edges if node == start else self.abstract_graph[node]
+            edges = list(edges.items())
+            if node in goal_edges:
+                edges.append((goal, goal_edges[node]))
+            for next_node, edge_cost in edges:
+                next_cost = cost + edge_cost
+                if next_cost < dist.get(next_node, math.inf):
+                    dist[next_node] = next_cost
+                    came_from[next_node] = node
+                    heapq.heappush(heap, (next_cost + self.octile(next_node, goal), next_cost, next_node))
+        return []
+
+    def add_edge(self, a, b, cost):
+        for node in a, b:
+            if node not in self.abstract_graph:
+                self.abstract_graph[node] = {}
+                self.cluster_nodes.setdefault(self.get_cluster(node), set()).add(node)
+        if cost < self.abstract_graph[a].get(b, math.inf):
+            self.abstract_graph[a][b] = self.abstract_graph[b][a] = cost
+
+    def add_entrances(self, pairs):
+        # one transition in the middle of a short open stretch of border, two at the ends of a long one
+        span = []
+        for pair in pairs + [None]:
+            if pair and self.is_open(pair[0]) and self.is_open(pair[1]):
+                span.append(pair)
+                continue
+            if span:
+                transitions = [span[len(span) // 2]] if len(span) < HPA_WIDE_ENTRANCE else [span[0], span[-1]]
+                for a, b in transitions:
+                    self.add_edge(a, b, 1)
+                span = []
+
+    def get_entrances(self):
+        size, rows, cols = self.cluster_size, self.map.rows, self.map.cols
+        for x in range(size - 1, cols - 1, size):
+            for y0 in range(0, rows, size):
+                self.add_entrances([((x, y), (x + 1, y)) for y in range(y0, min(y0 + size, rows))])
+        for y in range(size - 1, rows - 1, size):
+            for x0 in range(0, cols, size):
+                self.add_entrances([((x, y), (x, y + 1)) for x in range(x0, min(x0 + size, cols))])
+
+    def get_intra_cluster_edges(self):
+        for cluster, nodes in self.cluster_nodes.items():
+            bounds = self.get_bounds(cluster)
+            for node in nodes:
+                dist, _ = self.search(node, bounds)
+                for other in nodes:
+                    if other != node and other in dist:
+                        self.add_edge(node, other, dist[other])
+        self.nodes_expanded = 0
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from assets import *
+
+
+def get_manifest():
+    # what to preload: the archive's entries at their runtime sizes, otherwise every image and
+    # sound file, which the game then scales from; anything already loaded is skipped
+    if assets.archive:
+        images = list(assets.archive.images)
+        sounds = list(assets.archive.sounds)
+    else:
+        images, sounds = [], []
+        for dir_path, dir_names, file_names in os.walk('resources'):
+            for file_name in file_names:
+                path = dir_path.replace(os.sep, '/') + '/' + file_name
+                if file_name.endswith('.png'):
+                    images.append((path, None))
+                elif file_name.endswith('.wav'):
+                    sounds.append(path)
+    return [key for key in images if key not in assets.images], [path for path in sounds if path not in assets.sounds]
+
+
+class AssetLoader:
+    # images are decoded and sounds loaded on background threads, the main thread converts
+    # the decoded images to the display format a batch at a time between loading screen frames
+    def __init__(self):
+        images, sounds = get_manifest()
+        self.total = len(images) + len(sounds)
+        self.loaded = 0
+        executor = ThreadPoolExecutor(LOADER_THREADS, thread_name_prefix='loader')
+        self.pending = [(assets.add_image, key, executor.submit(assets.decode_image, *key)) for key in images]
+        self.pending += [(self.add_sound, (path,), executor.submit(assets.load_sound, path)) for path in sounds]
+        # the threads exit once the queue is drained
+        executor.shutdown(wait=False)
+
+    @property
+    def done(self):
+        return not self.pending
+
+    @property
+    def progress(self):
+        return self.loaded / self.total if self.total else 1
+
+    @staticmethod
+    def add_sound(path, sound):
+        assets.sounds[path] = sound
+
+    def update(self):
+        # waits a little when nothing is ready so the loading screen does not spin
+        wait([future for *_, future in self.pending], timeout=0.01, return_when=FIRST_COMPLETED)
+        pending, batch = [], 0
+        for add, key, future in self.pending:
+            if batch < LOADER_BATCH and future.done():
+                add(*key, future.result())
+                batch += 1
+            else:
+                pending.append((add, key, future))
+        self.pending = pending
+        self.loaded += batch
+
+    def draw(self, screen):
+        screen.fill('black')
+        bar = pg.Rect(0, 0, WIDTH // 2, 24)
+        bar.center = HALF_WIDTH, HALF_HEIGHT
+        pg.draw.rect(screen, 'darkred', (bar.x, bar.y, bar.width * self.progress, bar.height))
+        pg.draw.rect(screen, 'gray', bar, 2)
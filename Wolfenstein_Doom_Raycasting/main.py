@@ -10,9 +10,14 @@ from object_handler import *
 from weapon import *
 from sound import *
 from pathfinding import *
+from loader import *
+from profiler import *
+from view import *
 
 
 class Game:
+    pipelined = False
+
     def __init__(self):
         pg.init()
         pg.mouse.set_visible(False)
@@ -23,9 +28,30 @@ class Game:
         self.global_trigger = False
         self.global_event = pg.USEREVENT + 0
         pg.time.set_timer(self.global_event, 40)
+        self.animation_clock = AnimationClock()
+        self.profiler = Profiler(self)
+        self.view = View(self)
+        self.resolution_controller = ResolutionController(self) if DYNAMIC_RESOLUTION else None
+        if ASYNC_LOADING:
+            self.load_assets()
         self.new_game()
+        # the game holds what it uses by now, loose files were preloaded at their original sizes
+        assets.drop_preloaded()
+
+    def load_assets(self):
+        loader = AssetLoader()
+        while not loader.done:
+            for event in pg.event.get():
+                if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
+                    pg.quit()
+                    sys.exit()
+            loader.update()
+            loader.draw(self.screen)
+            pg.display.flip()
 
     def new_game(self):
+        # the cursors of the last game's objects go with them
+        self.animation_clock.cursors.clear()
         self.map = Map(self)
         self.player = Player(self)
         self.object_renderer = ObjectRenderer(self)
@@ -36,19 +62,63 @@ class Game:
         self.pathfinding = PathFinding(self)
         pg.mixer.music.play(-1)
 
+    def end_game(self, draw_screen):
+        # game over or win screen, then a new game
+        draw_screen()
+        pg.display.flip()
+        pg.time.delay(1500)
+        self.new_game()
+
     def update(self):
+        self.animation_clock.update()
+        self.profiler.lap('events')
         self.player.update()
+        self.profiler.lap('player')
         self.raycasting.update()
+        self.profiler.lap('raycasting')
         self.object_handler.update()
+        self.profiler.lap('object_handler')
         self.weapon.update()
+        self.profiler.lap('weapon')
         pg.display.flip()
-        self.delta_time = self.clock.tick(FPS)
+        self.profiler.lap('flip')
+        self.delta_time = self.tick()
+        self.profiler.lap('tick')
         pg.display.set_caption(f'{self.clock.get_fps() :.1f}')
 
+    def set_render_scale(self, scale):
+        # surfaces scaled for the old resolution would only take up cache space
+        if not self.view.set_scale(scale):
+            return False
+        self.raycasting.resize()
+        self.object_renderer.resize()
+        self.object_handler.sprite_cache.clear()
+        return True
+
+    # input and timing hooks, replaced by benchmark.py with a fixed script
+    def tick(self):
+        return self.clock.tick(FPS)
+
+    def get_keys(self):
+        return pg.key.get_pressed()
+
+    def get_mouse_pos(self):
+        return pg.mouse.get_pos()
+
+    def get_mouse_rel(self):
+        return pg.mouse.get_rel()
+
     def draw(self):
         # self.screen.fill('black')
         self.object_renderer.draw()
         self.weapon.draw()
+        self.profiler.lap('draw')
+        self.profiler.draw()
+        self.profiler.lap('overlay')
+        self.profiler.end_frame()
+        # the frame was cast and drawn at one resolution, a new one starts with the next frame
+        if self.resolution_controller:
+            self.resolution_controller.update()
         # self.map.draw()
         # self.player.draw()
 
@@ -61,6 +131,7 @@ class Game:
             elif event.type == self.global_event:
                 self.global_trigger = True
             self.player.single_fire_event(event)
+            self.profiler.check_event(event)
 
     def run(self):
         while True:
@@ -70,5 +141,9 @@ class Game:
 
 
 if __name__ == '__main__':
-    game = Game()
+    if PIPELINED:
+        from pipeline import PipelinedGame
+        game = PipelinedGame()
+    else:
+        game = Game()
     game.run()
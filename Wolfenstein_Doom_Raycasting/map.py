@@ -1,4 +1,5 @@
 import pygame as pg
+import numpy as np
 
 _ = False
 mini_map = [
@@ -38,12 +39,15 @@ mini_map = [
 
 
 class Map:
-    def __init__(self, game):
+    def __init__(self, game, mini_map=mini_map):
         self.game = game
         self.mini_map = mini_map
         self.world_map = {}
         self.rows = len(self.mini_map)
         self.cols = len(self.mini_map[0])
+        # row-major tile grid, 0 for empty tiles; grid_array is a numpy view of the same memory
+        self.grid = bytearray(self.rows * self.cols)
+        self.grid_array = np.frombuffer(self.grid, dtype=np.uint8).reshape(self.rows, self.cols)
         self.get_map()
 
     def get_map(self):
@@ -51,6 +55,12 @@ class Map:
             for i, value in enumerate(row):
                 if value:
                     self.world_map[(i, j)] = value
+                    self.grid[j * self.cols + i] = value
+
+    def get_tile(self, x, y):
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return self.grid[y * self.cols + x]
+        return 0
 
     def draw(self):
         [pg.draw.rect(self.game.screen, 'darkgray', (pos[0] * 100, pos[1] * 100, 100, 100), 2)
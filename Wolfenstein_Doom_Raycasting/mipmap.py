@@ -0,0 +1,47 @@
+import hashlib
+import os
+import numpy as np
+from settings import *
+
+MIP_VERSION = 1
+
+
+def get_mip_sizes():
+    # texture size of every level, TEXTURE_SIZE halved down to WALL_MIP_MIN_SIZE
+    sizes = [TEXTURE_SIZE]
+    while WALL_MIPMAPS and sizes[-1] // 2 >= max(WALL_MIP_MIN_SIZE, SCALE):
+        sizes.append(sizes[-1] // 2)
+    return sizes
+
+
+MIP_SIZES = get_mip_sizes()
+
+
+def get_mip_level(height):
+    # the smallest level that is still at least as tall as the wall on screen
+    return min(max((TEXTURE_SIZE // max(height, 1)).bit_length() - 1, 0), len(MIP_SIZES) - 1)
+
+
+def build_mip_chain(pixels):
+    # pixels are [texture, y, x, channel] uint8, every level averages 2x2 blocks of the one above
+    levels = [pixels]
+    for _ in MIP_SIZES[1:]:
+        p = levels[-1].astype(np.uint16)
+        levels.append(((p[:, 0::2, 0::2] + p[:, 1::2, 0::2] + p[:, 0::2, 1::2] + p[:, 1::2, 1::2] + 2) // 4)
+                      .astype(np.uint8))
+    return levels
+
+
+def load_mip_chain(pixels):
+    # built once per set of textures and kept on disk next to the pvs cache
+    key = hashlib.sha1(pixels.tobytes())
+    key.update(repr((pixels.shape, MIP_SIZES, MIP_VERSION)).encode())
+    path = os.path.join(CACHE_DIR, f'mips_{key.hexdigest()}.npz')
+    if os.path.isfile(path):
+        with np.load(path) as data:
+            return [data[f'level_{level}'] for level in range(len(MIP_SIZES))]
+
+    levels = build_mip_chain(pixels)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    np.savez(path, **{f'level_{level}': mips for level, mips in enumerate(levels)})
+    return levels
@@ -6,13 +6,13 @@ class NPC(AnimatedSprite):
     def __init__(self, game, path='resources/sprites/npc/soldier/0.png', pos=(10.5, 5.5),
                  scale=0.6, shift=0.38, animation_time=180):
         super().__init__(game, path, pos, scale, shift, animation_time)
-        self.attack_images = self.get_images(self.path + '/attack')
-        self.death_images = self.get_images(self.path + '/death')
-        self.idle_images = self.get_images(self.path + '/idle')
-        self.pain_images = self.get_images(self.path + '/pain')
-        self.walk_images = self.get_images(self.path + '/walk')
+        self.attack_clip = get_clip(self.path + '/attack')
+        self.death_clip = get_clip(self.path + '/death')
+        self.idle_clip = get_clip(self.path + '/idle')
+        self.pain_clip = get_clip(self.path + '/pain')
+        self.walk_clip = get_clip(self.path + '/walk')
 
-        self.attack_dist = randint(3, 6)
+        self.attack_dist = self.get_attack_dist()
         self.speed = 0.03
         self.size = 20
         self.health = 100
@@ -21,17 +21,26 @@ class NPC(AnimatedSprite):
         self.alive = True
         self.pain = False
         self.ray_cast_value = False
-        self.frame_counter = 0
         self.player_search_trigger = False
+        self.logic_frame = 0
+        self.logic_frames = 1  # frames this logic update stands for, more for npc AIScheduler defers
+
+    def get_attack_dist(self):
+        # drawn for each npc, NPCStore draws it the same way
+        return randint(3, 6)
 
     def update(self):
-        self.check_animation_time()
         self.get_sprite()
-        self.run_logic()
+        self.update_logic()
         # self.draw_ray_cast()
 
+    def update_logic(self):
+        # what AIScheduler runs at reduced rates for distant npc
+        self.check_animation_time()
+        self.run_logic()
+
     def check_wall(self, x, y):
-        return (x, y) not in self.game.map.world_map
+        return not self.game.map.get_tile(x, y)
 
     def check_wall_collision(self, dx, dy):
         if self.check_wall(int(self.x + dx * self.size), int(self.y)):
@@ -40,15 +49,25 @@ class NPC(AnimatedSprite):
             self.y += dy
 
     def movement(self):
-        next_pos = self.game.pathfinding.get_path(self.map_pos, self.game.player.map_pos)
+        worker = self.game.object_handler.ai_worker
+        if worker:
+            next_pos = worker.get_path(self, self.map_pos, self.game.player.map_pos)
+            if next_pos is None:
+                return
+        else:
+            next_pos = self.game.pathfinding.get_path(self.map_pos, self.game.player.map_pos)
         next_x, next_y = next_pos
 
         # pg.draw.rect(self.game.screen, 'blue', (100 * next_x, 100 * next_y, 100, 100))
-        if next_pos not in self.game.object_handler.npc_positions:
+        occupancy = self.game.object_handler.occupancy
+        if next_pos not in occupancy:
             angle = math.atan2(next_y + 0.5 - self.y, next_x + 0.5 - self.x)
             dx = math.cos(angle) * self.speed
             dy = math.sin(angle) * self.speed
-            self.check_wall_collision(dx, dy)
+            # one step per frame, so deferred npc keep their speed and still collide like every frame
+            for _ in range(self.logic_frames):
+                self.check_wall_collision(dx, dy)
+            occupancy.move(self)
 
     def attack(self):
         if self.animation_trigger:
@@ -58,34 +77,43 @@ class NPC(AnimatedSprite):
 
     def animate_death(self):
         if not self.alive:
-            if self.game.global_trigger and self.frame_counter < len(self.death_images) - 1:
-                self.death_images.rotate(-1)
-                self.image = self.death_images[0]
-                self.frame_counter += 1
+            if self.game.global_trigger:
+                self.image = self.cursor.advance_once(self.death_clip) or self.image
 
     def animate_pain(self):
-        self.animate(self.pain_images)
+        self.animate(self.pain_clip)
         if self.animation_trigger:
             self.pain = False
 
     def check_hit_in_npc(self):
         if self.ray_cast_value and self.game.player.shot:
-            if HALF_WIDTH - self.sprite_half_width < self.screen_x < HALF_WIDTH + self.sprite_half_width:
-                self.game.sound.npc_pain.play()
-                self.game.player.shot = False
-                self.pain = True
-                self.health -= self.game.weapon.damage
-                self.check_health()
+            half_width = self.game.view.half_width
+            if half_width - self.sprite_half_width < self.screen_x < half_width + self.sprite_half_width:
+                self.get_hit()
+
+    def get_hit(self):
+        self.game.sound.npc_pain.play()
+        self.game.player.shot = False
+        self.pain = True
+        self.health -= self.game.weapon.damage
+        self.check_health()
 
     def check_health(self):
         if self.health < 1:
             self.alive = False
+            # the death clip runs on the global trigger instead, once
+            self.game.animation_clock.remove(self.cursor)
+            self.game.object_handler.occupancy.remove(self)
             self.game.sound.npc_death.play()
 
     def run_logic(self):
         if self.alive:
-            self.ray_cast_value = self.ray_cast_player_npc()
-            self.check_hit_in_npc()
+            if NPC_VISIBILITY == 'depth_buffer':
+                # shots are resolved for all npc at once by ObjectHandler.check_hit
+                self.ray_cast_value = self.check_visibility()
+            else:
+                self.ray_cast_value = self.ray_cast_player_npc()
+                self.check_hit_in_npc()
 
             if self.pain:
                 self.animate_pain()
@@ -94,18 +122,18 @@ class NPC(AnimatedSprite):
                 self.player_search_trigger = True
 
                 if self.dist < self.attack_dist:
-                    self.animate(self.attack_images)
+                    self.animate(self.attack_clip)
                     self.attack()
                 else:
-                    self.animate(self.walk_images)
+                    self.animate(self.walk_clip)
                     self.movement()
 
             elif self.player_search_trigger:
-                self.animate(self.walk_images)
+                self.animate(self.walk_clip)
                 self.movement()
 
             else:
-                self.animate(self.idle_images)
+                self.animate(self.idle_clip)
         else:
             self.animate_death()
 
@@ -113,10 +141,27 @@ class NPC(AnimatedSprite):
     def map_pos(self):
         return int(self.x), int(self.y)
 
+    def check_visibility(self):
+        # on screen, the wall depth buffer of this frame already tells whether any column
+        # of the npc is in sight; npc behind or beside the player still need a ray
+        if self.on_screen:
+            return bool(self.visible_spans)
+        return self.ray_cast_player_npc()
+
     def ray_cast_player_npc(self):
         if self.game.player.map_pos == self.map_pos:
             return True
 
+        pvs = self.game.object_handler.pvs
+        if pvs:
+            visible = pvs.check(self.game.player.map_pos, self.map_pos)
+            if visible is not None:
+                return visible
+
+        worker = self.game.object_handler.ai_worker
+        if worker:
+            return worker.get_visibility(self)
+
         wall_dist_v, wall_dist_h = 0, 0
         player_dist_v, player_dist_h = 0, 0
 
@@ -142,7 +187,7 @@ class NPC(AnimatedSprite):
             if tile_hor == self.map_pos:
                 player_dist_h = depth_hor
                 break
-            if tile_hor in self.game.map.world_map:
+            if self.game.map.get_tile(*tile_hor):
                 wall_dist_h = depth_hor
                 break
             x_hor += dx
@@ -163,7 +208,7 @@ class NPC(AnimatedSprite):
             if tile_vert == self.map_pos:
                 player_dist_v = depth_vert
                 break
-            if tile_vert in self.game.map.world_map:
+            if self.game.map.get_tile(*tile_vert):
                 wall_dist_v = depth_vert
                 break
             x_vert += dx
@@ -193,22 +238,26 @@ class CacoDemonNPC(NPC):
     def __init__(self, game, path='resources/sprites/npc/caco_demon/0.png', pos=(10.5, 6.5),
                  scale=0.7, shift=0.27, animation_time=250):
         super().__init__(game, path, pos, scale, shift, animation_time)
-        self.attack_dist = 1.0
         self.health = 150
         self.attack_damage = 25
         self.speed = 0.05
         self.accuracy = 0.35
 
+    def get_attack_dist(self):
+        return 1.0
+
 class CyberDemonNPC(NPC):
     def __init__(self, game, path='resources/sprites/npc/cyber_demon/0.png', pos=(11.5, 6.0),
                  scale=1.0, shift=0.04, animation_time=210):
         super().__init__(game, path, pos, scale, shift, animation_time)
-        self.attack_dist = 6
         self.health = 350
         self.attack_damage = 15
         self.speed = 0.055
         self.accuracy = 0.25
 
+    def get_attack_dist(self):
+        return 6
+
 
 
 
@@ -0,0 +1,238 @@
+from npc import *
+from visibility import *
+import numpy as np
+from random import choices
+
+IDLE, WALK, ATTACK, PAIN = range(4)
+
+
+class NPCStore:
+    # npc kept as structure of arrays and advanced in batches; follows NPC.run_logic
+    def __init__(self, game, npc_types, occupancy):
+        self.game = game
+        self.occupancy = occupancy
+        # one prototype per type holds the type parameters and images and is the view
+        # that store npc are rendered through
+        self.prototypes = [npc_type(game) for npc_type in npc_types]
+        self.clips = [[clips[proto.idle_clip], clips[proto.walk_clip], clips[proto.attack_clip], clips[proto.pain_clip]]
+                      for proto in self.prototypes]
+        self.death_clips = [clips[proto.death_clip] for proto in self.prototypes]
+
+        def get_param(name):
+            return np.array([getattr(proto, name) for proto in self.prototypes], dtype=float)
+        self.type_speed = get_param('speed')
+        self.type_size = get_param('size')
+        self.type_health = get_param('health')
+        self.type_attack_damage = get_param('attack_damage')
+        self.type_accuracy = get_param('accuracy')
+        self.type_animation_time = get_param('animation_time')
+        self.type_proj_ratio = get_param('SPRITE_SCALE') * get_param('IMAGE_RATIO')
+        self.type_half_width = get_param('IMAGE_HALF_WIDTH')
+
+        self.count = 0
+        self.type = np.zeros(0, dtype=np.int8)
+        self.x, self.y = np.zeros(0), np.zeros(0)
+        self.health = np.zeros(0)
+        self.attack_dist = np.zeros(0)
+        self.state = np.zeros(0, dtype=np.int8)
+        self.frame = np.zeros(0, dtype=np.int32)
+        self.death_frame = np.zeros(0, dtype=np.int32)
+        self.animation_time_prev = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.pain = np.zeros(0, dtype=bool)
+        self.ray_cast_value = np.zeros(0, dtype=bool)
+        self.player_search_trigger = np.zeros(0, dtype=bool)
+        self.animation_trigger = np.zeros(0, dtype=bool)
+        self.screen_x, self.dist, self.norm_dist = np.zeros(0), np.zeros(0), np.zeros(0)
+        self.on_screen = np.zeros(0, dtype=bool)
+
+    def add_npc(self, types, xs, ys):
+        n = len(types)
+        types = np.asarray(types, dtype=np.int8)
+        self.type = np.concatenate([self.type, types])
+        self.x = np.concatenate([self.x, np.asarray(xs, dtype=float)])
+        self.y = np.concatenate([self.y, np.asarray(ys, dtype=float)])
+        self.health = np.concatenate([self.health, self.type_health[types]])
+        self.attack_dist = np.concatenate(
+            [self.attack_dist, [self.prototypes[npc_type].get_attack_dist() for npc_type in types.tolist()]])
+        self.state = np.concatenate([self.state, np.full(n, IDLE, dtype=np.int8)])
+        self.frame = np.concatenate([self.frame, np.zeros(n, dtype=np.int32)])
+        self.death_frame = np.concatenate([self.death_frame, np.zeros(n, dtype=np.int32)])
+        self.animation_time_prev = np.concatenate(
+            [self.animation_time_prev, np.full(n, self.game.animation_clock.time, dtype=np.int64)])
+        for name in ('pain', 'ray_cast_value', 'player_search_trigger', 'animation_trigger', 'on_screen'):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(n, dtype=bool)]))
+        self.alive = np.concatenate([self.alive, np.ones(n, dtype=bool)])
+        self.count += n
+        self.occupancy.add_tiles(self.x[-n:].astype(int), self.y[-n:].astype(int))
+
+    def spawn_npc(self, count, weights, restricted_area):
+        game_map = self.game.map
+        open_tiles = [(x, y) for y in range(game_map.rows) for x in range(game_map.cols)
+                      if not game_map.get_tile(x, y) and (x, y) not in restricted_area]
+        types = choices(range(len(self.prototypes)), weights, k=count)
+        xs, ys = zip(*choices(open_tiles, k=count))
+        self.add_npc(types, np.array(xs) + 0.5, np.array(ys) + 0.5)
+
+    def update(self):
+        if not self.count:
+            return
+        self.check_animation_time()
+        self.project()
+        if not self.game.pipelined:
+            self.get_sprites(*self.get_render_state())
+        self.check_visibility()
+        self.check_hit()
+        self.run_logic()
+
+    def check_animation_time(self):
+        time_now = self.game.animation_clock.time
+        self.animation_trigger = time_now - self.animation_time_prev > self.type_animation_time[self.type]
+        self.animation_time_prev[self.animation_trigger] = time_now
+
+    def project(self):
+        view = self.game.view
+        _, _, _, self.screen_x, self.dist, self.norm_dist = get_projections(self.game.player, view, self.x, self.y)
+        half_width = self.type_half_width[self.type]
+        self.on_screen = (-half_width < self.screen_x) & (self.screen_x < view.width + half_width) & (self.norm_dist > 0.5)
+
+    def get_render_state(self):
+        # copies of what get_sprites reads for the npc on screen
+        on_screen = self.on_screen
+        return tuple(array[on_screen] for array in (
+            self.type, self.alive, self.state, self.frame, self.death_frame, self.screen_x, self.norm_dist))
+
+    def get_sprites(self, npc_type, alive, state, frame, death_frame, screen_x, norm_dist):
+        # npc hidden behind walls are culled in one pass, the rest are drawn with
+        # their type's parameters and the npc's frame and projection
+        proj_width = self.game.view.screen_dist / norm_dist * self.type_proj_ratio[npc_type]
+        left = (screen_x - proj_width // 2).astype(int)
+        visible = self.game.raycasting.get_visible_mask(left, left + proj_width.astype(int), norm_dist)
+        for npc_type, alive, state, frame, death_frame, screen_x, norm_dist in zip(
+                npc_type[visible].tolist(), alive[visible].tolist(), state[visible].tolist(),
+                frame[visible].tolist(), death_frame[visible].tolist(), screen_x[visible].tolist(),
+                norm_dist[visible].tolist()):
+            proto = self.prototypes[npc_type]
+            if alive:
+                clip = self.clips[npc_type][state]
+                image = clip[frame % len(clip)]
+            else:
+                image = self.death_clips[npc_type][death_frame]
+            project_sprite(self.game, image, screen_x, norm_dist,
+                           proto.IMAGE_RATIO, proto.SPRITE_SCALE, proto.SPRITE_HEIGHT_SHIFT)
+
+    def check_visibility(self):
+        alive = np.flatnonzero(self.alive)
+        player_x = np.full(len(alive), self.game.player.x)
+        player_y = np.full(len(alive), self.game.player.y)
+        self.ray_cast_value[:] = False
+        self.ray_cast_value[alive] = cast_player_npc_rays(
+            self.game.map.grid_array, player_x, player_y, self.x[alive], self.y[alive])
+
+    def check_hit(self):
+        # same rule as ObjectHandler.check_hit: nearest living npc under the crosshair in front of the wall
+        if not self.game.player.shot:
+            return
+        view = self.game.view
+        with np.errstate(divide='ignore'):
+            half_width = view.screen_dist / self.norm_dist * self.type_proj_ratio[self.type] // 2
+        wall_depth = self.game.raycasting.depth_buffer[view.half_width // SCALE]
+        hit = (self.on_screen & self.alive & self.ray_cast_value &
+               (np.abs(self.screen_x - view.half_width) < half_width) & (self.norm_dist < wall_depth))
+        if not hit.any():
+            return
+
+        i = int(np.argmin(np.where(hit, self.norm_dist, np.inf)))
+        self.game.sound.npc_pain.play()
+        self.game.player.shot = False
+        self.pain[i] = True
+        self.health[i] -= self.game.weapon.damage
+        if self.health[i] < 1:
+            self.alive[i] = False
+            self.occupancy.remove_tiles(self.x[i:i + 1].astype(int), self.y[i:i + 1].astype(int))
+            self.game.sound.npc_death.play()
+
+    def run_logic(self):
+        alive, trigger = self.alive, self.animation_trigger
+        pain = alive & self.pain
+        in_sight = alive & ~self.pain & self.ray_cast_value
+        self.player_search_trigger |= in_sight
+
+        attack = in_sight & (self.dist < self.attack_dist)
+        walk = (in_sight & ~attack) | (alive & ~self.pain & ~self.ray_cast_value & self.player_search_trigger)
+        self.state[alive] = IDLE
+        self.state[walk] = WALK
+        self.state[attack] = ATTACK
+        self.state[pain] = PAIN
+        self.frame[alive & trigger] += 1
+
+        self.pain[pain & trigger] = False
+        self.attack(attack & trigger)
+        self.movement(walk)
+        self.animate_death()
+
+    def attack(self, attackers):
+        attackers = np.flatnonzero(attackers)
+        if not len(attackers):
+            return
+        # one sound per frame is enough for any number of shots
+        self.game.sound.npc_shot.play()
+        npc_types = self.type[attackers]
+        hits = np.array([random() for _ in attackers]) < self.type_accuracy[npc_types]
+        damage = int(self.type_attack_damage[npc_types][hits].sum())
+        if damage:
+            self.game.player.get_damage(damage)
+
+    def animate_death(self):
+        if self.game.global_trigger:
+            last_frame = np.array([len(clip) - 1 for clip in self.death_clips])[self.type]
+            self.death_frame[~self.alive & (self.death_frame < last_frame)] += 1
+
+    def movement(self, moving):
+        moving = np.flatnonzero(moving)
+        if not len(moving):
+            return
+        game_map, player = self.game.map, self.game.player
+        distance = self.game.pathfinding.get_flow_field_grid(player.map_pos)
+        x, y = self.x[moving], self.y[moving]
+        tile_x, tile_y = x.astype(int), y.astype(int)
+
+        ways = np.array(self.game.pathfinding.ways)
+        next_x, next_y = tile_x[:, None] + ways[:, 0], tile_y[:, None] + ways[:, 1]
+        inside = (0 <= next_x) & (next_x < game_map.cols) & (0 <= next_y) & (next_y < game_map.rows)
+        next_x, next_y = np.where(inside, next_x, 0), np.where(inside, next_y, 0)
+        next_dist = np.where(inside, distance[next_y, next_x], np.inf)
+
+        start_dist = distance[tile_y, tile_x]
+        goal = (next_x == player.map_pos[0]) & (next_y == player.map_pos[1])
+        # tiles taken by other npc are avoided like in get_path_flow_field
+        free = (self.occupancy.counts[next_y, next_x] == 0) | goal
+        downhill = next_dist <= start_dist[:, None]
+        step_dist = np.where(downhill & free, next_dist, np.inf)
+        step = np.argmin(step_dist, axis=1)
+        rows = np.arange(len(moving))
+        next_x, next_y = next_x[rows, step], next_y[rows, step]
+
+        # npc on the goal or cut off from it head straight for the player's tile, npc whose
+        # every downhill tile is taken wait in line
+        at_goal = (start_dist == 0) | ~np.isfinite(start_dist)
+        next_x = np.where(at_goal, player.map_pos[0], next_x)
+        next_y = np.where(at_goal, player.map_pos[1], next_y)
+        waiting = ~at_goal & ~np.isfinite(step_dist[rows, step])
+
+        angle = np.arctan2(next_y + 0.5 - y, next_x + 0.5 - x)
+        speed = np.where(waiting, 0, self.type_speed[self.type[moving]])
+        dx, dy = np.cos(angle) * speed, np.sin(angle) * speed
+        size = self.type_size[self.type[moving]]
+
+        # check_wall_collision for the whole batch
+        x = np.where(self.check_wall((x + dx * size).astype(int), y.astype(int)), x + dx, x)
+        y = np.where(self.check_wall(x.astype(int), (y + dy * size).astype(int)), y + dy, y)
+        self.x[moving], self.y[moving] = x, y
+        self.occupancy.move_tiles(tile_x, tile_y, x.astype(int), y.astype(int))
+
+    def check_wall(self, x, y):
+        # tiles off the map are open, like Map.get_tile has them
+        game_map = self.game.map
+        inside = (0 <= x) & (x < game_map.cols) & (0 <= y) & (y < game_map.rows)
+        return ~inside | (game_map.grid_array[np.where(inside, y, 0), np.where(inside, x, 0)] == 0)
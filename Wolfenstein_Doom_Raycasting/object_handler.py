@@ -1,5 +1,12 @@
 from sprite_object import *
 from npc import *
+from surface_cache import *
+from visibility import *
+from npc_store import *
+from ai_scheduler import *
+from ai_worker import *
+from occupancy import *
+import numpy as np
 from random import choices, randrange
 
 
@@ -13,14 +20,25 @@ class ObjectHandler:
         self.anim_sprite_path = 'resources/sprites/animated_sprites/'
         add_sprite = self.add_sprite
         add_npc = self.add_npc
-        self.npc_positions = {}
+        self.occupancy = OccupancyGrid(game.map)
+        self.sprite_cache = SurfaceCache(SPRITE_CACHE_SIZE)
+        self.pvs = PotentiallyVisibleSet(game.map) if NPC_PVS else None
+        self.ai_scheduler = AIScheduler(game) if AI_SCHEDULER else None
+        self.ai_worker = AIWorker(game) if AI_WORKERS else None
+        self.object_positions = np.zeros((0, 2))
+        self.object_half_widths = np.zeros(0)
 
         # spawn npc
         self.enemies = 20  # npc count
         self.npc_types = [SoldierNPC, CacoDemonNPC, CyberDemonNPC]
         self.weights = [70, 20, 10]
         self.restricted_area = {(i, j) for i in range(10) for j in range(10)}
-        self.spawn_npc()
+        self.npc_store = None
+        if NPC_STORE:
+            self.npc_store = NPCStore(game, self.npc_types, self.occupancy)
+            self.npc_store.spawn_npc(NPC_STORE_ENEMIES, self.weights, self.restricted_area)
+        else:
+            self.spawn_npc()
 
         # sprite map
         add_sprite(AnimatedSprite(game))
@@ -60,25 +78,74 @@ class ObjectHandler:
         for i in range(self.enemies):
                 npc = choices(self.npc_types, self.weights)[0]
                 pos = x, y = randrange(self.game.map.cols), randrange(self.game.map.rows)
-                while (pos in self.game.map.world_map) or (pos in self.restricted_area):
+                while self.game.map.get_tile(x, y) or (pos in self.restricted_area):
                     pos = x, y = randrange(self.game.map.cols), randrange(self.game.map.rows)
                 self.add_npc(npc(self.game, pos=(x + 0.5, y + 0.5)))
 
     def check_win(self):
-        if not len(self.npc_positions):
-            self.game.object_renderer.win()
-            pg.display.flip()
-            pg.time.delay(1500)
-            self.game.new_game()
+        if not self.occupancy.npc_count:
+            self.game.end_game(self.game.object_renderer.win)
+
+    def get_object_arrays(self):
+        # static sprites first, npc rows are refreshed every frame
+        objects = self.sprite_list + self.npc_list
+        self.object_positions = np.array([(obj.x, obj.y) for obj in objects], dtype=float).reshape(-1, 2)
+        self.object_half_widths = np.array([obj.IMAGE_HALF_WIDTH for obj in objects], dtype=float)
+        self.object_proj_ratios = np.array([obj.SPRITE_SCALE * obj.IMAGE_RATIO for obj in objects], dtype=float)
+
+    def project_objects(self):
+        if len(self.object_positions) != len(self.sprite_list) + len(self.npc_list):
+            self.get_object_arrays()
+        if self.npc_list:
+            self.object_positions[len(self.sprite_list):] = [(npc.x, npc.y) for npc in self.npc_list]
+
+        view = self.game.view
+        dx, dy, theta, screen_x, dist, norm_dist = get_projections(
+            self.game.player, view, self.object_positions[:, 0], self.object_positions[:, 1])
+        half_widths = self.object_half_widths
+        on_screen = (-half_widths < screen_x) & (screen_x < view.width + half_widths) & (norm_dist > 0.5)
+
+        for obj, *projection in zip(self.sprite_list + self.npc_list, dx.tolist(), dy.tolist(), theta.tolist(),
+                                    screen_x.tolist(), dist.tolist(), norm_dist.tolist(), on_screen.tolist()):
+            obj.set_projection(*projection)
+        self.screen_x, self.norm_dist, self.on_screen = screen_x, norm_dist, on_screen
+
+    def check_hit(self):
+        # the shot goes to the nearest living npc under the crosshair that is in front of the wall there
+        if not self.game.player.shot or not self.npc_list:
+            return
+        first_npc = len(self.sprite_list)
+        screen_x, norm_dist = self.screen_x[first_npc:], self.norm_dist[first_npc:]
+        on_screen = self.on_screen[first_npc:]
+        alive = np.array([npc.alive for npc in self.npc_list])
+        view = self.game.view
+        with np.errstate(divide='ignore'):
+            half_width = view.screen_dist / norm_dist * self.object_proj_ratios[first_npc:] // 2
+        wall_depth = self.game.raycasting.depth_buffer[view.half_width // SCALE]
+
+        hit = on_screen & alive & (np.abs(screen_x - view.half_width) < half_width) & (norm_dist < wall_depth)
+        if hit.any():
+            self.npc_list[int(np.argmin(np.where(hit, norm_dist, np.inf)))].get_hit()
 
     def update(self):
-        self.npc_positions = {npc.map_pos for npc in self.npc_list if npc.alive}
+        self.project_objects()
+        if NPC_VISIBILITY == 'depth_buffer':
+            self.check_hit()
         [sprite.update() for sprite in self.sprite_list]
-        [npc.update() for npc in self.npc_list]
+        if self.ai_scheduler:
+            [npc.get_sprite() for npc in self.npc_list]
+            self.ai_scheduler.update(self.npc_list)
+        else:
+            [npc.update() for npc in self.npc_list]
+        if self.ai_worker:
+            self.ai_worker.update()
+        if self.npc_store:
+            self.npc_store.update()
         self.check_win()
 
     def add_npc(self, npc):
         self.npc_list.append(npc)
+        self.occupancy.add(npc)
 
     def add_sprite(self, sprite):
         self.sprite_list.append(sprite)
\ No newline at end of file
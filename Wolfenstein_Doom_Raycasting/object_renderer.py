@@ -1,14 +1,27 @@
 import pygame as pg
+import numpy as np
 from settings import *
+from assets import *
+from mipmap import *
 
 
 class ObjectRenderer:
     def __init__(self, game):
         self.game = game
         self.screen = game.screen
+        self.view = game.view
+        self.damaged = False
         self.wall_textures = self.load_wall_textures()
-        self.sky_image = self.get_texture('resources/textures/sky.png', (WIDTH, HALF_HEIGHT))
+        self.wall_mips = assets.get('wall_mips', self.get_wall_mips)
+        self.wall_columns = assets.get('wall_columns', self.get_wall_columns)
+        if WALL_RENDERER == 'framebuffer':
+            self.wall_texels = assets.get('wall_texels', self.get_wall_texels)
+            self.mip_sizes = np.array(MIP_SIZES, dtype=np.int32)
+            self.strips_per_row = self.mip_sizes - SCALE + 1
+            level_texels = (max(self.wall_textures) + 1) * self.mip_sizes * self.strips_per_row
+            self.mip_bases = np.concatenate(([0], np.cumsum(level_texels)[:-1])).astype(np.int32)
         self.sky_offset = 0
+        self.resize()
         self.blood_screen = self.get_texture('resources/textures/blood_screen.png', RES)
         self.digit_size = 90
         self.digit_images = [self.get_texture(f'resources/textures/digits/{i}.png', [self.digit_size] * 2)
@@ -18,10 +31,18 @@ class ObjectRenderer:
         self.win_image = self.get_texture('resources/textures/win.png', RES)
         self.crosshair = self.get_texture('resources/textures/crosshair.png', (50, 50))
 
-    def draw(self):
-        self.draw_background()
+    def resize(self):
+        # the 3D view is drawn at the view's resolution, the hud over it at the window's
+        self.sky_image = self.get_texture('resources/textures/sky.png', (self.view.width, self.view.half_height))
+        self.texel_rows = np.arange(self.view.height, dtype=np.int32)
+
+    def draw(self, player=None):
+        # player is the live one, or the pipelined game's snapshot of it
+        player = player or self.game.player
+        self.draw_background(player.rel)
         self.render_game_objects()
-        self.draw_player_health()
+        self.view.present()
+        self.draw_player_health(player.health)
         self.draw_crosshair()
 
     def draw_crosshair(self):
@@ -34,31 +55,121 @@ class ObjectRenderer:
     def game_over(self):
         self.screen.blit(self.game_over_image, (0, 0))
 
-    def draw_player_health(self):
-        health = str(self.game.player.health)
+    def draw_player_health(self, health):
+        health = str(health)
         for i, char in enumerate(health):
             self.screen.blit(self.digits[char], (i * self.digit_size, 0))
         self.screen.blit(self.digits['10'], ((i + 1) * self.digit_size, 0))
 
     def player_damage(self):
-        self.screen.blit(self.blood_screen, (0, 0))
+        # the pipelined game's simulation thread leaves the screen to the renderer, which draws
+        # the blood screen over the frame the damage is in
+        if self.game.pipelined:
+            self.damaged = True
+        else:
+            self.screen.blit(self.blood_screen, (0, 0))
 
-    def draw_background(self):
-        self.sky_offset = (self.sky_offset + 0.5 * self.game.player.rel) % WIDTH
-        self.screen.blit(self.sky_image, (-self.sky_offset, 0))
-        self.screen.blit(self.sky_image, (-self.sky_offset + WIDTH, 0))
+    def draw_background(self, rel):
+        self.sky_offset = (self.sky_offset + 0.5 * rel) % WIDTH
+        view = self.view
+        sky_offset = int(self.sky_offset * view.width / WIDTH)
+        view.surface.blit(self.sky_image, (-sky_offset, 0))
+        view.surface.blit(self.sky_image, (-sky_offset + view.width, 0))
         # floor
-        pg.draw.rect(self.screen, FLOOR_COLOR, (0, HALF_HEIGHT, WIDTH, HEIGHT))
+        pg.draw.rect(view.surface, FLOOR_COLOR, (0, view.half_height, view.width, view.height))
 
     def render_game_objects(self):
-        list_objects = sorted(self.game.raycasting.objects_to_render, key=lambda t: t[0], reverse=True)
-        for depth, image, pos in list_objects:
-            self.screen.blit(image, pos)
+        if WALL_RENDERER == 'framebuffer':
+            self.render_walls_framebuffer()
+        else:
+            self.view.surface.blits(self.game.raycasting.walls_to_render, doreturn=False)
+        self.render_sprites()
+
+    def render_sprites(self):
+        # sprites are already clipped against the wall depth buffer, so only they need ordering
+        list_objects = sorted(self.game.raycasting.sprites_to_render, key=lambda t: t[0], reverse=True)
+        surface = self.view.surface
+        for depth, image, pos, spans in list_objects:
+            x, y = pos
+            for left, right in spans:
+                surface.blit(image, (left, y), (left - x, 0, right - left, image.get_height()))
+
+    def render_walls_framebuffer(self):
+        depth, proj_height, texture, offset = self.game.raycasting.ray_casting_arrays
+        view = self.view
+
+        # vertical extent of every wall column, the mip level it samples and the texture rows it maps to
+        tall = proj_height >= view.height
+        height = np.where(tall, view.height, proj_height).astype(np.int32)
+        level = np.clip(np.log2(TEXTURE_SIZE / np.maximum(height, 1)).astype(np.int32), 0, len(MIP_SIZES) - 1)
+        size, strips_per_row = self.mip_sizes[level], self.strips_per_row[level]
+        texture_height = np.where(tall, TEXTURE_SIZE * view.height / proj_height, size).astype(np.int32)
+        top = np.where(tall, 0, view.half_height - height // 2).astype(np.int32)
+        texel_top = np.where(tall, HALF_TEXTURE_SIZE - texture_height // 2, 0)
+        texel_step = (texture_height << 16) // np.maximum(height, 1)  # 16.16 fixed point
+        texel_x = (offset * (size - SCALE)).astype(np.int32)
+        strip_base = (self.mip_bases[level] + (texture.astype(np.int32) * size + texel_top) * strips_per_row
+                      + texel_x)
+
+        # only the view rows some wall reaches, laid out (y, ray) to follow the pixel memory order;
+        # rows outside a wall wrap to huge unsigned values and land outside `visible`
+        y_min, y_max = max(top.min(), 0), min((top + height).max(), view.height)
+        rows = self.texel_rows[y_min:y_max, None] - top
+        visible = rows.view(np.uint32) < height.view(np.uint32)
+        rows *= texel_step
+        rows >>= 16
+        rows *= strips_per_row
+        rows += strip_base
+
+        # the view surface's own pixel array is the framebuffer; each element of this array view is
+        # one SCALE pixel wide ray column, so a single gather fills a whole ray
+        frame = pg.surfarray.pixels2d(view.surface).T[y_min:y_max, :view.num_rays * SCALE]
+        frame = frame.view(self.wall_texels.dtype)
+
+        # rows every wall covers are gathered straight into the view, the rest are masked
+        band_top = max(top.max() - y_min, 0)
+        band_bottom = max((top + height).min() - y_min, band_top)
+        np.take(self.wall_texels, rows[band_top:band_bottom], out=frame[band_top:band_bottom], mode='clip')
+        for edge in slice(0, band_top), slice(band_bottom, None):
+            np.copyto(frame[edge], np.take(self.wall_texels, rows[edge], mode='clip'), where=visible[edge])
+        del frame
 
     @staticmethod
     def get_texture(path, res=(TEXTURE_SIZE, TEXTURE_SIZE)):
-        texture = pg.image.load(path).convert_alpha()
-        return pg.transform.scale(texture, res)
+        return assets.get_image(path, res)
+
+    def get_wall_mips(self):
+        # wall textures per mip level, level 0 being the textures themselves
+        texture_ids = list(self.wall_textures)
+        pixels = np.stack([
+            np.frombuffer(pg.image.tobytes(self.wall_textures[texture_id], 'RGBA'), dtype=np.uint8)
+            .reshape(TEXTURE_SIZE, TEXTURE_SIZE, 4) for texture_id in texture_ids
+        ])
+        levels = load_mip_chain(pixels)
+        return [self.wall_textures] + [
+            {texture_id: pg.image.frombytes(mips[i].tobytes(), mips.shape[1:3], 'RGBA').convert_alpha()
+             for i, texture_id in enumerate(texture_ids)}
+            for mips in levels[1:]
+        ]
+
+    def get_wall_columns(self):
+        # every SCALE-wide column strip a wall ray can sample per mip level, sliced once at load time
+        return [{
+            texture_id: [texture.subsurface(x, 0, SCALE, size) for x in range(size - SCALE + 1)]
+            for texture_id, texture in mips.items()
+        } for size, mips in zip(MIP_SIZES, self.wall_mips)]
+
+    def get_wall_texels(self):
+        # every SCALE pixel wide row strip of the wall textures in the screen's pixel format,
+        # packed into one element each, indexed [texture, y, x] and stored level after level
+        levels = []
+        for size, mips in zip(MIP_SIZES, self.wall_mips):
+            texels = np.zeros((max(self.wall_textures) + 1, size, size), dtype=np.uint32)
+            for texture_id, texture in mips.items():
+                texels[texture_id] = pg.surfarray.array2d(texture.convert(self.screen)).T
+            strips = np.lib.stride_tricks.sliding_window_view(texels, SCALE, axis=2)
+            levels.append(np.ascontiguousarray(strips).view((np.void, strips.itemsize * SCALE)).reshape(-1))
+        return np.concatenate(levels)
 
     def load_wall_textures(self):
         return {
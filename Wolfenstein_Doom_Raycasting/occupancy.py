@@ -0,0 +1,83 @@
+import numpy as np
+from settings import *
+
+
+class OccupancyGrid:
+    # living npc per tile plus a spatial hash of npc per cell of SPATIAL_HASH_CELL tiles,
+    # both changed only when an npc enters another tile, spawns or dies
+    def __init__(self, game_map):
+        self.rows, self.cols = game_map.rows, game_map.cols
+        self.counts = np.zeros((self.rows, self.cols), dtype=np.int32)
+        self.npc_count = 0
+        self.tiles = {}
+        self.cells = {}
+
+    def __contains__(self, pos):
+        x, y = pos
+        return 0 <= x < self.cols and 0 <= y < self.rows and self.counts[y, x] > 0
+
+    @staticmethod
+    def get_cell(tile):
+        return tile[0] // SPATIAL_HASH_CELL, tile[1] // SPATIAL_HASH_CELL
+
+    def add(self, npc):
+        tile = self.tiles[npc] = npc.map_pos
+        self.counts[tile[1], tile[0]] += 1
+        self.npc_count += 1
+        self.cells.setdefault(self.get_cell(tile), set()).add(npc)
+
+    def remove(self, npc):
+        tile = self.tiles.pop(npc, None)
+        if tile is None:
+            return
+        self.counts[tile[1], tile[0]] -= 1
+        self.npc_count -= 1
+        self.remove_from_cell(npc, self.get_cell(tile))
+
+    def move(self, npc):
+        old_tile, tile = self.tiles.get(npc), npc.map_pos
+        if old_tile is None or old_tile == tile:
+            return
+        self.tiles[npc] = tile
+        self.counts[old_tile[1], old_tile[0]] -= 1
+        self.counts[tile[1], tile[0]] += 1
+        old_cell, cell = self.get_cell(old_tile), self.get_cell(tile)
+        if old_cell != cell:
+            self.remove_from_cell(npc, old_cell)
+            self.cells.setdefault(cell, set()).add(npc)
+
+    def remove_from_cell(self, npc, cell):
+        npc_set = self.cells[cell]
+        npc_set.discard(npc)
+        if not npc_set:
+            del self.cells[cell]
+
+    def npcs_in_radius(self, x, y, radius):
+        # npc objects within radius of (x, y); npc of an NPCStore are only counted per tile and
+        # are never in the result, ask the store's x and y arrays for those
+        cell_x0, cell_y0 = self.get_cell((math.floor(x - radius), math.floor(y - radius)))
+        cell_x1, cell_y1 = self.get_cell((math.floor(x + radius), math.floor(y + radius)))
+        radius_sq = radius * radius
+        return [npc for cell_x in range(cell_x0, cell_x1 + 1) for cell_y in range(cell_y0, cell_y1 + 1)
+                for npc in self.cells.get((cell_x, cell_y), ())
+                if (npc.x - x) ** 2 + (npc.y - y) ** 2 <= radius_sq]
+
+    def add_tiles(self, xs, ys):
+        # batch counterparts of add, remove and move for tiles given as int arrays
+        np.add.at(self.counts, (ys, xs), 1)
+        self.npc_count += len(xs)
+
+    def remove_tiles(self, xs, ys):
+        np.subtract.at(self.counts, (ys, xs), 1)
+        self.npc_count -= len(xs)
+
+    def move_tiles(self, old_xs, old_ys, xs, ys):
+        moved = (old_xs != xs) | (old_ys != ys)
+        if moved.any():
+            np.subtract.at(self.counts, (old_ys[moved], old_xs[moved]), 1)
+            np.add.at(self.counts, (ys[moved], xs[moved]), 1)
+
+    def get_positions(self):
+        # immutable snapshot of the taken tiles
+        ys, xs = np.nonzero(self.counts)
+        return frozenset(zip(xs.tolist(), ys.tolist()))
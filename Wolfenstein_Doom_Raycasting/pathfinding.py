@@ -1,5 +1,7 @@
 from collections import deque
-from functools import lru_cache
+from settings import *
+import numpy as np
+from hierarchical_pathfinding import *
 
 
 class PathFinding:
@@ -9,9 +11,21 @@ class PathFinding:
         self.ways = [-1, 0], [0, -1], [1, 0], [0, 1], [-1, -1], [1, -1], [1, 1], [-1, 1]
         self.graph = {}
         self.get_graph()
+        self.flow_field = {}
+        self.flow_field_goal = None
+        self.flow_field_grid = None
+        self.flow_field_grid_goal = None
+        self.hpa = HierarchicalPathFinding(game.map) if PATHFINDING_ENGINE == 'hpa' else None
+        self.path_engine = {
+            'bfs': self.get_path_bfs,
+            'flow_field': self.get_path_flow_field,
+            'hpa': self.get_path_hpa,
+        }[PATHFINDING_ENGINE]
 
-    @lru_cache
     def get_path(self, start, goal):
+        return self.path_engine(start, goal)
+
+    def get_path_bfs(self, start, goal):
         self.visited = self.bfs(start, goal, self.graph)
         path = [goal]
         step = self.visited.get(goal, start)
@@ -21,6 +35,50 @@ class PathFinding:
             step = self.visited[step]
         return path[-1]
 
+    def get_path_hpa(self, start, goal):
+        return self.hpa.get_path(start, goal)
+
+    def get_path_flow_field(self, start, goal):
+        if goal != self.flow_field_goal:
+            self.get_flow_field(goal)
+
+        distance = self.flow_field
+        if start == goal or start not in distance:
+            return goal
+
+        # step downhill, preferring tiles not taken by other npc; when every downhill
+        # tile is taken, sidestep to a free tile at the same distance or wait in line
+        occupancy = self.game.object_handler.occupancy
+        start_dist = distance[start]
+        steps = [node for node in self.graph[start] if distance.get(node, start_dist + 1) <= start_dist]
+        free_steps = [node for node in steps if node == goal or node not in occupancy]
+        return min(free_steps or steps, key=distance.get)
+
+    def get_flow_field(self, goal):
+        # distance in steps from every reachable tile to the goal
+        self.flow_field_goal = goal
+        self.flow_field = distance = {goal: 0}
+        queue = deque([goal])
+
+        while queue:
+            cur_node = queue.popleft()
+            next_dist = distance[cur_node] + 1
+            for next_node in self.graph.get(cur_node, []):
+                if next_node not in distance:
+                    distance[next_node] = next_dist
+                    queue.append(next_node)
+
+    def get_flow_field_grid(self, goal):
+        # the flow field as a (rows, cols) array for batched lookups, inf where the goal is unreachable
+        if goal != self.flow_field_grid_goal:
+            if goal != self.flow_field_goal:
+                self.get_flow_field(goal)
+            self.flow_field_grid_goal = goal
+            self.flow_field_grid = grid = np.full((self.game.map.rows, self.game.map.cols), np.inf)
+            (xs, ys), dist = zip(*self.flow_field), list(self.flow_field.values())
+            grid[list(ys), list(xs)] = dist
+        return self.flow_field_grid
+
     def bfs(self, start, goal, graph):
         queue = deque([start])
         visited = {start: None}
@@ -32,16 +90,16 @@ class PathFinding:
             next_nodes = graph[cur_node]
 
             for next_node in next_nodes:
-                if next_node not in visited and next_node not in self.game.object_handler.npc_positions:
+                if next_node not in visited and next_node not in self.game.object_handler.occupancy:
                     queue.append(next_node)
                     visited[next_node] = cur_node
         return visited
 
     def get_next_nodes(self, x, y):
-        return [(x + dx, y + dy) for dx, dy in self.ways if (x + dx, y + dy) not in self.game.map.world_map]
+        return [(x + dx, y + dy) for dx, dy in self.ways if not self.game.map.get_tile(x + dx, y + dy)]
 
     def get_graph(self):
         for y, row in enumerate(self.map):
             for x, col in enumerate(row):
                 if not col:
-                    self.graph[(x, y)] = self.graph.get((x, y), []) + self.get_next_nodes(x, y)
\ No newline at end of file
+                    self.graph[(x, y)] = self.graph.get((x, y), []) + self.get_next_nodes(x, y)
@@ -0,0 +1,108 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from main import *
+
+# what the renderer needs of one simulated frame, taken at the end of the frame and never changed after
+PlayerState = namedtuple('PlayerState', 'x y angle rel health pos map_pos')
+WorldSnapshot = namedtuple('WorldSnapshot', 'player sprites npc_store weapon_image damaged')
+
+
+def take_snapshot(game):
+    player, object_handler = game.player, game.object_handler
+    damaged, game.object_renderer.damaged = game.object_renderer.damaged, False
+    return WorldSnapshot(
+        PlayerState(player.x, player.y, player.angle, player.rel, player.health, player.pos, player.map_pos),
+        tuple(obj.get_render_state() for obj in object_handler.sprite_list + object_handler.npc_list
+              if obj.on_screen),
+        object_handler.npc_store.get_render_state() if object_handler.npc_store else None,
+        game.weapon.image,
+        damaged,
+    )
+
+
+class PipelinedGame(Game):
+    # frame N is drawn on the main thread from its snapshot while frame N + 1 is simulated on a second
+    # thread; the two only meet once a frame, when the next snapshot is handed over. Frame N is cast
+    # before the simulation starts and its depth buffer is left alone until the simulation is done,
+    # so npc visibility and hits of frame N + 1 always read the depth buffer of frame N
+    pipelined = True
+
+    def __init__(self):
+        super().__init__()
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix='simulation')
+        self.input = None
+        self.end_screen = None
+
+    def capture_input(self):
+        # read on the main thread, the simulation thread gets this frame's copy
+        mx, my = pg.mouse.get_pos()
+        if mx < MOUSE_BORDER_LEFT or mx > MOUSE_BORDER_RIGHT:
+            pg.mouse.set_pos([HALF_WIDTH, HALF_HEIGHT])
+            mx, my = HALF_WIDTH, HALF_HEIGHT
+        self.input = pg.key.get_pressed(), (mx, my), pg.mouse.get_rel()
+
+    def get_keys(self):
+        return self.input[0]
+
+    def get_mouse_pos(self):
+        return self.input[1]
+
+    def get_mouse_rel(self):
+        return self.input[2]
+
+    def end_game(self, draw_screen):
+        # shown and restarted on the main thread once the simulation thread is done with the frame
+        self.end_screen = draw_screen
+
+    def simulate(self):
+        self.animation_clock.update()
+        self.player.update()
+        self.object_handler.update()
+        self.weapon.update()
+        return take_snapshot(self)
+
+    def render(self, snapshot):
+        for sprite in snapshot.sprites:
+            project_sprite(self, *sprite)
+        if snapshot.npc_store:
+            self.object_handler.npc_store.get_sprites(*snapshot.npc_store)
+        self.object_renderer.draw(snapshot.player)
+        if snapshot.damaged:
+            self.screen.blit(self.object_renderer.blood_screen, (0, 0))
+        self.weapon.draw(snapshot.weapon_image)
+
+    def run(self):
+        self.capture_input()
+        snapshot = self.simulate()
+        while True:
+            self.check_events()
+            self.capture_input()
+            self.profiler.lap('events')
+            self.raycasting.update(snapshot.player)
+            self.profiler.lap('raycasting')
+            simulation = self.executor.submit(self.simulate)
+            self.render(snapshot)
+            self.profiler.lap('render')
+            self.profiler.draw()
+            self.profiler.lap('overlay')
+            pg.display.flip()
+            self.profiler.lap('flip')
+            snapshot = simulation.result()
+            self.profiler.lap('simulation wait')
+
+            if self.end_screen:
+                draw_screen, self.end_screen = self.end_screen, None
+                Game.end_game(self, draw_screen)
+                snapshot = self.simulate()
+            self.delta_time = self.tick()
+            self.profiler.lap('tick')
+            self.profiler.end_frame()
+            # resolution changes happen here, while the simulation thread is idle
+            if self.resolution_controller:
+                self.resolution_controller.update()
+            pg.display.set_caption(f'{self.clock.get_fps() :.1f}')
+
+
+if __name__ == '__main__':
+    game = PipelinedGame()
+    game.run()
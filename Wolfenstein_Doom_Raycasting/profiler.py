@@ -0,0 +1,158 @@
+import json
+import os
+import time
+import tracemalloc
+import numpy as np
+import pygame as pg
+from settings import *
+from assets import *
+
+COUNTERS = 'rays', 'sprites', 'scaled', 'npcs'
+
+
+class Profiler:
+    # per frame stage timings and counters kept in ring buffers of the last PROFILER_FRAMES frames,
+    # shown over the game while toggled on with PROFILER_KEY and written to PROFILER_DIR on hitches
+    def __init__(self, game):
+        self.game = game
+        self.enabled = False
+        self.key = pg.key.key_code(PROFILER_KEY)
+        self.stages = {}
+        self.counters = {name: np.zeros(PROFILER_FRAMES, dtype=np.int64) for name in COUNTERS}
+        self.frame_times = np.zeros(PROFILER_FRAMES)
+        self.memory = np.zeros(PROFILER_FRAMES, dtype=np.int64)
+        self.frame = 0
+        self.lap_time = self.frame_start = time.perf_counter()
+        self.scaled_prev = 0
+        self.memory_prev = 0
+        self.last_dump = -PROFILER_DUMP_FRAMES
+        self.font = None
+        self.text = []
+        if PROFILER:
+            self.toggle()
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if PROFILER_TRACEMALLOC:
+            if self.enabled:
+                tracemalloc.start()
+                self.memory_prev = tracemalloc.get_traced_memory()[0]
+            else:
+                tracemalloc.stop()
+        self.lap_time = self.frame_start = time.perf_counter()
+
+    def check_event(self, event):
+        if event.type == pg.KEYDOWN and event.key == self.key:
+            self.toggle()
+
+    def lap(self, name):
+        # time since the previous lap goes to stage name
+        if not self.enabled:
+            return
+        time_now = time.perf_counter()
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = np.zeros(PROFILER_FRAMES)
+        stage[self.frame % PROFILER_FRAMES] = time_now - self.lap_time
+        self.lap_time = time_now
+
+    def get_counters(self):
+        # read from the subsystems once a frame rather than counted where the work happens
+        game = self.game
+        object_handler = game.object_handler
+        rays = len(game.raycasting.ray_casting_result)
+        sprites = int(np.count_nonzero(object_handler.on_screen)) if hasattr(object_handler, 'on_screen') else 0
+        npcs = len(object_handler.npc_list)
+        if object_handler.ai_scheduler:
+            npcs = object_handler.ai_scheduler.updated
+        if object_handler.npc_store:
+            sprites += int(np.count_nonzero(object_handler.npc_store.on_screen))
+            npcs += int(np.count_nonzero(object_handler.npc_store.alive))
+        # every cache miss is a surface scaled, the caches start over with each new game
+        scaled = game.raycasting.wall_cache.misses + object_handler.sprite_cache.misses
+        scaled, self.scaled_prev = scaled - self.scaled_prev if scaled >= self.scaled_prev else scaled, scaled
+        return rays, sprites, scaled, npcs
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        time_now = time.perf_counter()
+        i = self.frame % PROFILER_FRAMES
+        self.frame_times[i] = time_now - self.frame_start
+        for name, value in zip(COUNTERS, self.get_counters()):
+            self.counters[name][i] = value
+        if PROFILER_TRACEMALLOC:
+            memory = tracemalloc.get_traced_memory()[0]
+            self.memory[i], self.memory_prev = memory - self.memory_prev, memory
+        self.frame += 1
+        if (self.frame_times[i] * 1000 > PROFILER_HITCH_MS and self.frame > PROFILER_DUMP_FRAMES
+                and self.frame - self.last_dump > PROFILER_DUMP_FRAMES):
+            self.dump()
+        # dumps are not part of the next frame
+        self.lap_time = self.frame_start = time.perf_counter()
+
+    def get_frames(self, count):
+        # ring buffer indices of the last count frames, oldest first
+        count = min(count, self.frame, PROFILER_FRAMES)
+        return np.arange(self.frame - count, self.frame) % PROFILER_FRAMES
+
+    def dump(self, path=None):
+        frames = self.get_frames(PROFILER_DUMP_FRAMES)
+        report = {
+            'frame': self.frame,
+            'frame_ms': (self.frame_times[frames] * 1000).round(3).tolist(),
+            'stages_ms': {name: (stage[frames] * 1000).round(3).tolist() for name, stage in self.stages.items()},
+            'counters': {name: counter[frames].tolist() for name, counter in self.counters.items()},
+        }
+        if PROFILER_TRACEMALLOC:
+            report['memory_delta'] = self.memory[frames].tolist()
+        if path is None:
+            os.makedirs(PROFILER_DIR, exist_ok=True)
+            path = os.path.join(PROFILER_DIR, f'hitch_{time.strftime("%Y%m%d_%H%M%S")}_{self.frame}.json')
+        with open(path, 'w') as file:
+            json.dump(report, file)
+        self.last_dump = self.frame
+        return path
+
+    def get_text(self):
+        frames = self.get_frames(PROFILER_FRAMES)
+        frame_ms = self.frame_times[frames] * 1000
+        lines = [f'frame {frame_ms.mean():.1f} ms  max {frame_ms.max():.1f} ms  {1000 / frame_ms.mean():.0f} fps']
+        lines += [f'{name:<16}{stage[frames].mean() * 1000:>7.2f} ms' for name, stage in self.stages.items()]
+        lines += [f'{name:<16}{counter[frames].mean():>7.0f}' for name, counter in self.counters.items()]
+        lines.append(f'{"render scale":<16}{self.game.view.scale:>7.2f}')
+        ai_worker = self.game.object_handler.ai_worker
+        if ai_worker:
+            lines.append(f'{"ai queue":<16}{ai_worker.queue_depth:>7}')
+            lines.append(f'{"ai latency":<16}{ai_worker.latency:>7.2f} ms')
+            lines.append(f'{"ai jobs":<16}{ai_worker.jobs_done:>7}')
+        if PROFILER_TRACEMALLOC:
+            lines.append(f'{"alloc":<16}{self.memory[frames].mean() / 1024:>7.1f} KB')
+        # derived assets keep being added while the game runs
+        lines += assets.get_report().splitlines()
+        return [self.font.render(line, True, 'white') for line in lines]
+
+    def draw(self):
+        if not self.enabled or not self.frame:
+            return
+        screen = self.game.screen
+        if self.font is None:
+            self.font = pg.font.Font(None, 22)
+        # text is rendered a few times a second, the graph every frame
+        if not self.text or not self.frame % PROFILER_TEXT_INTERVAL:
+            self.text = self.get_text()
+
+        width, line_height = max(260, max(line.get_width() for line in self.text) + 10), self.text[0].get_height()
+        panel = pg.Rect(WIDTH - width - 10, 10, width, len(self.text) * line_height + PROFILER_GRAPH_HEIGHT + 20)
+        screen.fill('black', panel)
+        for i, line in enumerate(self.text):
+            screen.blit(line, (panel.x + 5, panel.y + 5 + i * line_height))
+
+        # one bar per frame, the line marks PROFILER_HITCH_MS
+        graph = pg.Rect(panel.x + 5, panel.bottom - PROFILER_GRAPH_HEIGHT - 5, width - 10, PROFILER_GRAPH_HEIGHT)
+        frames = self.get_frames(graph.width)
+        heights = np.minimum(self.frame_times[frames] * 1000 / (2 * PROFILER_HITCH_MS), 1) * graph.height
+        for x, (frame_ms, height) in enumerate(zip((self.frame_times[frames] * 1000).tolist(), heights.tolist())):
+            color = 'red' if frame_ms > PROFILER_HITCH_MS else 'green'
+            pg.draw.line(screen, color, (graph.x + x, graph.bottom), (graph.x + x, graph.bottom - height))
+        pg.draw.line(screen, 'yellow', (graph.x, graph.centery), (graph.right, graph.centery))
@@ -1,45 +1,123 @@
 import pygame as pg
+import numpy as np
 import math
 from settings import *
+from surface_cache import *
+from mipmap import *
+from thread_pool import *
 
 
 class RayCasting:
     def __init__(self, game):
         self.game = game
+        self.view = game.view
+        # the live player, or the pipelined game's snapshot of it
+        self.player = game.player
         self.ray_casting_result = []
-        self.objects_to_render = []
-        self.textures = self.game.object_renderer.wall_textures
+        self.ray_casting_arrays = ()
+        self.depth_max_table = None
+        self.walls_to_render = []
+        self.sprites_to_render = []
+        self.wall_columns = self.game.object_renderer.wall_columns
+        self.wall_cache = SurfaceCache(WALL_CACHE_SIZE)
+        self.grid = self.game.map.grid_array
+        self.depth_steps = np.arange(MAX_DEPTH)
+        self.workers = RAY_CAST_WORKERS
+        self.resize()
+        self.ray_cast_engine = {
+            'python': self.ray_cast,
+            'numpy': self.ray_cast_numpy,
+        }[RAY_CASTING_ENGINE]
 
-    def get_objects_to_render(self):
-        self.objects_to_render = []
+    def resize(self):
+        # per ray tables of the view's current resolution
+        self.depth_buffer = np.zeros(self.view.num_rays)
+        self.ray_offsets = np.arange(self.view.num_rays) * self.view.delta_angle
+        self.wall_cache.clear()
+
+    def get_wall_column(self, texture, level, column, texture_height, height):
+        wall_column = self.wall_columns[level][texture][column]
+        if texture_height < MIP_SIZES[level]:
+            wall_column = wall_column.subsurface(
+                0, HALF_TEXTURE_SIZE - texture_height // 2, SCALE, texture_height
+            )
+        return pg.transform.scale(wall_column, (SCALE, height))
+
+    def get_walls_to_render(self):
+        self.walls_to_render = []
+        cache = self.wall_cache
+        view_height, view_half_height = self.view.height, self.view.half_height
         for ray, values in enumerate(self.ray_casting_result):
             depth, proj_height, texture, offset = values
 
-            if proj_height < HEIGHT:
-                wall_column = self.textures[texture].subsurface(
-                    offset * (TEXTURE_SIZE - SCALE), 0, SCALE, TEXTURE_SIZE
-                )
-                wall_column = pg.transform.scale(wall_column, (SCALE, proj_height))
-                wall_pos = (ray * SCALE, HALF_HEIGHT - proj_height // 2)
+            if proj_height < view_height:
+                # distant walls sample a smaller mip level
+                height = int(proj_height) // WALL_CACHE_HEIGHT_STEP * WALL_CACHE_HEIGHT_STEP
+                level = get_mip_level(height)
+                texture_height = MIP_SIZES[level]
+                wall_pos = (ray * SCALE, view_half_height - height // 2)
             else:
-                texture_height = TEXTURE_SIZE * HEIGHT / proj_height
-                wall_column = self.textures[texture].subsurface(
-                    offset * (TEXTURE_SIZE - SCALE), HALF_TEXTURE_SIZE - texture_height // 2,
-                    SCALE, texture_height
-                )
-                wall_column = pg.transform.scale(wall_column, (SCALE, HEIGHT))
+                # walls taller than the view only show the middle rows of the texture
+                height = view_height
+                level = 0
+                texture_height = int(TEXTURE_SIZE * view_height / proj_height)
                 wall_pos = (ray * SCALE, 0)
+            column = int(offset * (MIP_SIZES[level] - SCALE)) // WALL_CACHE_OFFSET_STEP * WALL_CACHE_OFFSET_STEP
+
+            key = texture, level, column, texture_height, height
+            wall_column = cache.get(key)
+            if wall_column is None:
+                wall_column = self.get_wall_column(texture, level, column, texture_height, height)
+                cache.put(key, wall_column)
+
+            self.walls_to_render.append((wall_column, wall_pos))
+
+    def get_visible_spans(self, left, right, depth):
+        # screen x ranges within [left, right) where something at this depth is in front of the walls
+        first_ray = max(left // SCALE, 0)
+        last_ray = min((right - 1) // SCALE + 1, self.view.num_rays)
+        if first_ray >= last_ray:
+            return []
+        visible = self.depth_buffer[first_ray:last_ray] > depth
+        if visible.all():
+            return [(left, right)]
+        visible = np.concatenate(([False], visible, [False]))
+        edges = np.flatnonzero(visible[1:] != visible[:-1]).reshape(-1, 2) + first_ray
+        return [(max(start * SCALE, left), min(end * SCALE, right)) for start, end in edges.tolist()]
 
-            self.objects_to_render.append((depth, wall_column, wall_pos))
+    def get_visible_mask(self, left, right, depth):
+        # get_visible_spans for arrays of sprites, only whether any span exists
+        if self.depth_max_table is None:
+            # row k holds the depth buffer maximum over 2 ** k rays starting at each ray
+            table = [self.depth_buffer]
+            while 2 ** len(table) <= self.view.num_rays:
+                step = 2 ** (len(table) - 1)
+                row = table[-1].copy()
+                row[:-step] = np.maximum(row[:-step], row[step:])
+                table.append(row)
+            self.depth_max_table = np.array(table)
+        first_ray = np.maximum(left // SCALE, 0)
+        last_ray = np.minimum((right - 1) // SCALE + 1, self.view.num_rays)
+        inside = first_ray < last_ray
+        level = np.log2(np.maximum(last_ray - first_ray, 1)).astype(int)
+        first_ray = np.where(inside, first_ray, 0)
+        last_ray = np.where(inside, last_ray - 2 ** level, 0)
+        depth_max = np.maximum(self.depth_max_table[level, first_ray], self.depth_max_table[level, last_ray])
+        return inside & (depth_max > depth)
+
+    def is_visible(self, x, depth):
+        ray = int(x) // SCALE
+        return 0 <= ray < self.view.num_rays and depth < self.depth_buffer[ray]
 
     def ray_cast(self):
         self.ray_casting_result = []
         texture_vert, texture_hor = 1, 1
-        ox, oy = self.game.player.pos
-        x_map, y_map = self.game.player.map_pos
+        get_tile = self.game.map.get_tile
+        ox, oy = self.player.pos
+        x_map, y_map = self.player.map_pos
 
-        ray_angle = self.game.player.angle - HALF_FOV + 0.0001
-        for ray in range(NUM_RAYS):
+        ray_angle = self.player.angle - HALF_FOV + 0.0001
+        for ray in range(self.view.num_rays):
             sin_a = math.sin(ray_angle)
             cos_a = math.cos(ray_angle)
 
@@ -53,9 +131,9 @@ class RayCasting:
             dx = delta_depth * cos_a
 
             for i in range(MAX_DEPTH):
-                tile_hor = int(x_hor), int(y_hor)
-                if tile_hor in self.game.map.world_map:
-                    texture_hor = self.game.map.world_map[tile_hor]
+                tile = get_tile(int(x_hor), int(y_hor))
+                if tile:
+                    texture_hor = tile
                     break
                 x_hor += dx
                 y_hor += dy
@@ -71,9 +149,9 @@ class RayCasting:
             dy = delta_depth * sin_a
 
             for i in range(MAX_DEPTH):
-                tile_vert = int(x_vert), int(y_vert)
-                if tile_vert in self.game.map.world_map:
-                    texture_vert = self.game.map.world_map[tile_vert]
+                tile = get_tile(int(x_vert), int(y_vert))
+                if tile:
+                    texture_vert = tile
                     break
                 x_vert += dx
                 y_vert += dy
@@ -90,16 +168,118 @@ class RayCasting:
                 offset = (1 - x_hor) if sin_a > 0 else x_hor
 
             # remove fishbowl effect
-            depth *= math.cos(self.game.player.angle - ray_angle)
+            depth *= math.cos(self.player.angle - ray_angle)
 
             # projection
-            proj_height = SCREEN_DIST / (depth + 0.0001)
+            proj_height = self.view.screen_dist / (depth + 0.0001)
 
             # ray casting result
             self.ray_casting_result.append((depth, proj_height, texture, offset))
 
-            ray_angle += DELTA_ANGLE
+            ray_angle += self.view.delta_angle
+
+        self.ray_casting_arrays = tuple(np.array(values) for values in zip(*self.ray_casting_result))
+
+    def get_first_hit(self, x, y):
+        # x, y: (rays, MAX_DEPTH) probe positions along each ray; texture is 0 for rays that hit nothing
+        rows, cols = self.grid.shape
+        tile_x, tile_y = x.astype(np.int64), y.astype(np.int64)
+        inside = (0 <= tile_x) & (tile_x < cols) & (0 <= tile_y) & (tile_y < rows)
+        tiles = np.where(inside, self.grid[tile_y.clip(0, rows - 1), tile_x.clip(0, cols - 1)], 0)
+
+        hit = tiles > 0
+        found = hit.any(axis=1)
+        step = np.where(found, hit.argmax(axis=1), MAX_DEPTH)
+        texture = np.where(found, tiles[np.arange(len(tiles)), step.clip(0, MAX_DEPTH - 1)], 0)
+        return step, texture
+
+    @staticmethod
+    def fill_textures(texture):
+        # rays that hit nothing keep the texture of the last hit, as in ray_cast
+        last_hit = np.maximum.accumulate(np.where(texture > 0, np.arange(len(texture)), -1))
+        return np.where(last_hit >= 0, texture[last_hit], 1)
+
+    def cast_rays(self, ray_angle, ox, oy, x_map, y_map):
+        # one band of rays, the only part that does not depend on the rays before it
+        sin_a = np.sin(ray_angle)
+        cos_a = np.cos(ray_angle)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # horizontals
+            y_hor = np.where(sin_a > 0, y_map + 1, y_map - 1e-6)
+            dy = np.where(sin_a > 0, 1, -1)
+
+            depth_hor = (y_hor - oy) / sin_a
+            x_hor = ox + depth_hor * cos_a
+
+            delta_depth = dy / sin_a
+            dx = delta_depth * cos_a
+
+            step, texture_hor = self.get_first_hit(
+                x_hor[:, None] + self.depth_steps * dx[:, None],
+                y_hor[:, None] + self.depth_steps * dy[:, None]
+            )
+            x_hor += step * dx
+            depth_hor += step * delta_depth
+
+            # verticals
+            x_vert = np.where(cos_a > 0, x_map + 1, x_map - 1e-6)
+            dx = np.where(cos_a > 0, 1, -1)
+
+            depth_vert = (x_vert - ox) / cos_a
+            y_vert = oy + depth_vert * sin_a
+
+            delta_depth = dx / cos_a
+            dy = delta_depth * sin_a
+
+            step, texture_vert = self.get_first_hit(
+                x_vert[:, None] + self.depth_steps * dx[:, None],
+                y_vert[:, None] + self.depth_steps * dy[:, None]
+            )
+            y_vert += step * dy
+            depth_vert += step * delta_depth
+
+            # depth, texture offset
+            vert = depth_vert < depth_hor
+            depth = np.where(vert, depth_vert, depth_hor)
+            y_vert %= 1
+            x_hor %= 1
+            offset = np.where(vert,
+                              np.where(cos_a > 0, y_vert, 1 - y_vert),
+                              np.where(sin_a > 0, 1 - x_hor, x_hor))
+        return depth, offset, vert, texture_hor, texture_vert
+
+    def ray_cast_numpy(self):
+        ox, oy = self.player.pos
+        x_map, y_map = self.player.map_pos
+
+        ray_angle = self.player.angle - HALF_FOV + 0.0001 + self.ray_offsets
+        if self.workers > 1:
+            # column bands cast on the pool, numpy releases the gil inside its kernels
+            bounds = np.linspace(0, len(ray_angle), self.workers + 1).astype(int).tolist()
+            bands = get_thread_pool('raycast', self.workers).map(
+                lambda band: self.cast_rays(ray_angle[band[0]:band[1]], ox, oy, x_map, y_map),
+                zip(bounds, bounds[1:]))
+            depth, offset, vert, texture_hor, texture_vert = map(np.concatenate, zip(*bands))
+        else:
+            depth, offset, vert, texture_hor, texture_vert = self.cast_rays(ray_angle, ox, oy, x_map, y_map)
+        texture = np.where(vert, self.fill_textures(texture_vert), self.fill_textures(texture_hor))
+
+        # remove fishbowl effect
+        depth *= np.cos(self.player.angle - ray_angle)
+
+        # projection
+        proj_height = self.view.screen_dist / (depth + 0.0001)
+
+        # ray casting result
+        self.ray_casting_arrays = depth, proj_height, texture, offset
+        self.ray_casting_result = list(zip(depth.tolist(), proj_height.tolist(), texture.tolist(), offset.tolist()))
 
-    def update(self):
-        self.ray_cast()
-        self.get_objects_to_render()
\ No newline at end of file
+    def update(self, player=None):
+        self.player = player or self.game.player
+        self.ray_cast_engine()
+        self.depth_buffer = self.ray_casting_arrays[0]
+        self.depth_max_table = None
+        self.sprites_to_render = []
+        if WALL_RENDERER == 'blit':
+            self.get_walls_to_render()
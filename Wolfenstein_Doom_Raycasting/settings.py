@@ -28,9 +28,67 @@ NUM_RAYS = WIDTH // 2
 HALF_NUM_RAYS = NUM_RAYS // 2
 DELTA_ANGLE = FOV / NUM_RAYS
 MAX_DEPTH = 20
+RAY_CASTING_ENGINE = 'numpy'  # 'python' or 'numpy'
+RAY_CAST_WORKERS = 0  # threads casting column bands with the numpy engine, 0 or 1 casts on the main thread
+WALL_RENDERER = 'blit'  # 'blit' or 'framebuffer'
 
 SCREEN_DIST = HALF_WIDTH / math.tan(HALF_FOV)
 SCALE = WIDTH // NUM_RAYS
+# the values above are the full resolution ones, game.view holds those of the current render scale
+DYNAMIC_RESOLUTION = True  # lower the 3D view's resolution to hold RENDER_TARGET_FRAME_TIME
+RENDER_SCALE = 1.0  # starting 3D view resolution relative to the window
+RENDER_SCALE_MIN = 0.5
+RENDER_SCALE_STEP = 0.05
+RENDER_SCALE_MAX_CHANGE = 0.1  # per adjustment
+RENDER_TARGET_FRAME_TIME = 1000 / 60  # ms
+RENDER_SCALE_INTERVAL = 30  # frames averaged per adjustment
+
+PATHFINDING_ENGINE = 'flow_field'  # 'bfs', 'flow_field' or 'hpa'
+HPA_CLUSTER_SIZE = 8  # tiles per cluster side
+HPA_WIDE_ENTRANCE = 6  # open border stretches this long get a transition at each end
+
+NPC_PVS = True  # answer npc line of sight from precomputed tile visibility where possible
+PVS_RADIUS = MAX_DEPTH  # tiles around each tile covered by its visibility bits
+CACHE_DIR = 'cache'
+NPC_VISIBILITY = 'depth_buffer'  # 'ray_cast' or 'depth_buffer'
+NPC_STORE = False  # simulate npc as numpy arrays in batches instead of one object each
+NPC_STORE_ENEMIES = 2000  # npc count when NPC_STORE is on
+AI_SCHEDULER = True  # update distant npc logic at reduced rates within a time budget
+AI_TIME_BUDGET = 4  # ms per frame for npc that are not updated every frame
+AI_NEAR_DIST = 8  # npc closer than this, in sight or in pain update every frame
+AI_FAR_DIST = 16
+AI_MID_INTERVAL = 2  # frames between updates up to AI_FAR_DIST
+AI_FAR_INTERVAL = 8  # frames between updates beyond it
+AI_WORKERS = 0  # threads answering npc path and line of sight queries a frame late, 0 answers them inline
+AI_MAX_PENDING = 4  # jobs in flight before new queries wait
+AI_LATENCY_SAMPLES = 120
+SPATIAL_HASH_CELL = 4  # tiles per side of a spatial hash cell for npc neighbour queries
+
+ASSET_ARCHIVE = 'resources/assets.pak'  # built by build_assets.py, loose files are used without it
+ASYNC_LOADING = True  # decode assets on background threads behind a loading screen
+LOADER_THREADS = 4
+LOADER_BATCH = 8  # decoded images converted per loading screen frame
+
+PIPELINED = False  # simulate the next frame on a second thread while this one is drawn, see pipeline.py
+
+PROFILER = False  # start with the profiler overlay on
+PROFILER_KEY = 'f3'  # toggles the overlay and the measurements
+PROFILER_FRAMES = 240  # frames kept in the ring buffers
+PROFILER_TRACEMALLOC = False  # also trace allocations while the overlay is on, slows everything down
+PROFILER_HITCH_MS = 50  # frames longer than this dump the last PROFILER_DUMP_FRAMES frames
+PROFILER_DUMP_FRAMES = 120
+PROFILER_DIR = 'profiles'
+PROFILER_TEXT_INTERVAL = 15  # frames between overlay text updates
+PROFILER_GRAPH_HEIGHT = 80
 
 TEXTURE_SIZE = 256
-HALF_TEXTURE_SIZE = TEXTURE_SIZE // 2
\ No newline at end of file
+HALF_TEXTURE_SIZE = TEXTURE_SIZE // 2
+WALL_MIPMAPS = True  # sample halved copies of the wall textures for walls shorter than them
+WALL_MIP_MIN_SIZE = 8
+
+WALL_CACHE_SIZE = 32 * 1024 * 1024  # bytes of scaled wall columns kept between frames
+WALL_CACHE_HEIGHT_STEP = 1  # projected height quantization, pixels
+WALL_CACHE_OFFSET_STEP = 1  # texture offset quantization, texture columns
+
+SPRITE_CACHE_SIZE = 64 * 1024 * 1024  # bytes of scaled sprite frames kept between frames
+SPRITE_CACHE_HEIGHT_STEP = 2  # projected height quantization, pixels
@@ -1,4 +1,5 @@
 import pygame as pg
+from assets import *
 
 
 class Sound:
@@ -6,11 +7,11 @@ class Sound:
         self.game = game
         pg.mixer.init()
         self.path = 'resources/sound/'
-        self.shotgun = pg.mixer.Sound(self.path + 'shotgun.wav')
-        self.npc_pain = pg.mixer.Sound(self.path + 'npc_pain.wav')
-        self.npc_death = pg.mixer.Sound(self.path + 'npc_death.wav')
-        self.npc_shot = pg.mixer.Sound(self.path + 'npc_attack.wav')
+        self.shotgun = assets.get_sound(self.path + 'shotgun.wav')
+        self.npc_pain = assets.get_sound(self.path + 'npc_pain.wav')
+        self.npc_death = assets.get_sound(self.path + 'npc_death.wav')
+        self.npc_shot = assets.get_sound(self.path + 'npc_attack.wav')
         self.npc_shot.set_volume(0.2)
-        self.player_pain = pg.mixer.Sound(self.path + 'player_pain.wav')
-        self.theme = pg.mixer.music.load(self.path + 'theme.mp3')
+        self.player_pain = assets.get_sound(self.path + 'player_pain.wav')
+        self.theme = assets.load_music(self.path + 'theme.mp3')
         pg.mixer.music.set_volume(0.3)
\ No newline at end of file
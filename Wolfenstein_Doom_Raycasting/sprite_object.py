@@ -1,7 +1,53 @@
 import pygame as pg
 from settings import *
-import os
-from collections import deque
+import numpy as np
+from assets import *
+from animation import *
+
+
+def get_projections(player, view, x, y):
+    # SpriteObject projection for arrays of positions at once, in view pixels
+    dx = x - player.x
+    dy = y - player.y
+    theta = np.arctan2(dy, dx)
+
+    delta = theta - player.angle
+    delta[((dx > 0) & (player.angle > math.pi)) | ((dx < 0) & (dy < 0))] += math.tau
+
+    delta_rays = delta / view.delta_angle
+    screen_x = (view.half_num_rays + delta_rays) * SCALE
+
+    dist = np.hypot(dx, dy)
+    norm_dist = dist * np.cos(delta)
+    return dx, dy, theta, screen_x, dist, norm_dist
+
+
+def project_sprite(game, image, screen_x, norm_dist, image_ratio, sprite_scale, height_shift, draw=True):
+    # half width on screen and visible spans of a sprite, queued for the renderer when drawn
+    view = game.view
+    proj = view.screen_dist / norm_dist * sprite_scale
+    proj_width, proj_height = proj * image_ratio, proj
+
+    half_width = proj_width // 2
+    height_shift = proj_height * height_shift
+    pos = int(screen_x - half_width), int(view.half_height - proj_height // 2 + height_shift)
+
+    # columns hidden behind walls are never drawn; fully hidden sprites are not even scaled
+    spans = game.raycasting.get_visible_spans(pos[0], pos[0] + int(proj_width), norm_dist)
+    if not spans or not draw:
+        return half_width, spans
+
+    # scaled frames are shared between all sprites through the object handler's cache
+    height = int(proj_height) // SPRITE_CACHE_HEIGHT_STEP * SPRITE_CACHE_HEIGHT_STEP
+    key = image, height
+    cache = game.object_handler.sprite_cache
+    scaled_image = cache.get(key)
+    if scaled_image is None:
+        scaled_image = pg.transform.scale(image, (height * image_ratio, height))
+        cache.put(key, scaled_image)
+
+    game.raycasting.sprites_to_render.append((norm_dist, scaled_image, pos, spans))
+    return half_width, spans
 
 
 class SpriteObject:
@@ -10,43 +56,33 @@ class SpriteObject:
         self.game = game
         self.player = game.player
         self.x, self.y = pos
-        self.image = pg.image.load(path).convert_alpha()
+        self.image = assets.get_image(path)
         self.IMAGE_WIDTH = self.image.get_width()
         self.IMAGE_HALF_WIDTH = self.image.get_width() // 2
         self.IMAGE_RATIO = self.IMAGE_WIDTH / self.image.get_height()
         self.dx, self.dy, self.theta, self.screen_x, self.dist, self.norm_dist = 0, 0, 0, 0, 1, 1
+        self.on_screen = False
+        self.visible_spans = []
         self.sprite_half_width = 0
         self.SPRITE_SCALE = scale
         self.SPRITE_HEIGHT_SHIFT = shift
 
     def get_sprite_projection(self):
-        proj = SCREEN_DIST / self.norm_dist * self.SPRITE_SCALE
-        proj_width, proj_height = proj * self.IMAGE_RATIO, proj
-
-        image = pg.transform.scale(self.image, (proj_width, proj_height))
+        # the pipelined game draws sprites from its world snapshot on the render side instead
+        self.sprite_half_width, self.visible_spans = project_sprite(
+            self.game, *self.get_render_state(), draw=not self.game.pipelined)
 
-        self.sprite_half_width = proj_width // 2
-        height_shift = proj_height * self.SPRITE_HEIGHT_SHIFT
-        pos = self.screen_x - self.sprite_half_width, HALF_HEIGHT - proj_height // 2 + height_shift
+    def get_render_state(self):
+        return self.image, self.screen_x, self.norm_dist, self.IMAGE_RATIO, self.SPRITE_SCALE, self.SPRITE_HEIGHT_SHIFT
 
-        self.game.raycasting.objects_to_render.append((self.norm_dist, image, pos))
+    def set_projection(self, dx, dy, theta, screen_x, dist, norm_dist, on_screen):
+        # computed for all objects at once by ObjectHandler.project_objects
+        self.dx, self.dy, self.theta = dx, dy, theta
+        self.screen_x, self.dist, self.norm_dist = screen_x, dist, norm_dist
+        self.on_screen = on_screen
 
     def get_sprite(self):
-        dx = self.x - self.player.x
-        dy = self.y - self.player.y
-        self.dx, self.dy = dx, dy
-        self.theta = math.atan2(dy, dx)
-
-        delta = self.theta - self.player.angle
-        if (dx > 0 and self.player.angle > math.pi) or (dx < 0 and dy < 0):
-            delta += math.tau
-
-        delta_rays = delta / DELTA_ANGLE
-        self.screen_x = (HALF_NUM_RAYS + delta_rays) * SCALE
-
-        self.dist = math.hypot(dx, dy)
-        self.norm_dist = self.dist * math.cos(delta)
-        if -self.IMAGE_HALF_WIDTH < self.screen_x < (WIDTH + self.IMAGE_HALF_WIDTH) and self.norm_dist > 0.5:
+        if self.on_screen:
             self.get_sprite_projection()
 
     def update(self):
@@ -59,31 +95,22 @@ class AnimatedSprite(SpriteObject):
         super().__init__(game, path, pos, scale, shift)
         self.animation_time = animation_time
         self.path = path.rsplit('/', 1)[0]
-        self.images = self.get_images(self.path)
-        self.animation_time_prev = pg.time.get_ticks()
+        self.clip = get_clip(self.path)
+        self.cursor = game.animation_clock.add(
+            AnimationCursor(self.clip, game.animation_clock.time + animation_time), animation_time)
         self.animation_trigger = False
+        self.next_time_seen = self.cursor.next_time
 
     def update(self):
+        self.image = self.cursor.image
         super().update()
-        self.check_animation_time()
-        self.animate(self.images)
 
-    def animate(self, images):
-        if self.animation_trigger:
-            images.rotate(-1)
-            self.image = images[0]
+    def animate(self, clip):
+        # the clock moves the frames on, objects only pick the clip
+        self.cursor.play(clip)
+        self.image = self.cursor.image
 
     def check_animation_time(self):
-        self.animation_trigger = False
-        time_now = pg.time.get_ticks()
-        if time_now - self.animation_time_prev > self.animation_time:
-            self.animation_time_prev = time_now
-            self.animation_trigger = True
-
-    def get_images(self, path):
-        images = deque()
-        for file_name in os.listdir(path):
-            if os.path.isfile(os.path.join(path, file_name)):
-                img = pg.image.load(path + '/' + file_name).convert_alpha()
-                images.append(img)
-        return images
+        # the clock moved the cursor on since the object last looked
+        self.animation_trigger = self.cursor.next_time != self.next_time_seen
+        self.next_time_seen = self.cursor.next_time
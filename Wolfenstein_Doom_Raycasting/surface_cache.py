@@ -0,0 +1,43 @@
+from collections import OrderedDict
+
+
+class SurfaceCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        surface = self.surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+        else:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+        return surface
+
+    def put(self, key, surface):
+        self.surfaces[key] = surface
+        self.bytes += self.get_size(surface)
+        # least recently used surfaces go first
+        while self.bytes > self.max_bytes and len(self.surfaces) > 1:
+            _, old_surface = self.surfaces.popitem(last=False)
+            self.bytes -= self.get_size(old_surface)
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+    @staticmethod
+    def get_size(surface):
+        return surface.get_pitch() * surface.get_height()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.surfaces)
@@ -0,0 +1,29 @@
+import random
+import numpy as np
+
+
+def test_occupancy_follows_moving_npc(game):
+    object_handler = game.object_handler
+    occupancy = object_handler.occupancy
+    game.player.get_damage = lambda damage: None
+    start = {}
+    for npc in object_handler.npc_list:
+        npc.player_search_trigger = True
+        start[npc] = npc.map_pos
+    for _ in range(120):
+        game.update()
+        game.draw()
+
+    living = [npc for npc in object_handler.npc_list if npc.alive]
+    assert any(npc.map_pos != start[npc] for npc in living)
+    counts = np.zeros_like(occupancy.counts)
+    for npc in living:
+        counts[npc.map_pos[1], npc.map_pos[0]] += 1
+    np.testing.assert_array_equal(occupancy.counts, counts)
+
+    rng = random.Random(0)
+    for _ in range(200):
+        x, y = rng.uniform(0, game.map.cols), rng.uniform(0, game.map.rows)
+        radius = rng.uniform(0.5, 12)
+        expected = {npc for npc in living if (npc.x - x) ** 2 + (npc.y - y) ** 2 <= radius * radius}
+        assert set(occupancy.npcs_in_radius(x, y, radius)) == expected
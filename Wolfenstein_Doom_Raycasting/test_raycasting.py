@@ -0,0 +1,15 @@
+import numpy as np
+from bench_raycasting import get_poses
+
+
+def test_numpy_engine_matches_python_engine(game):
+    raycasting, player = game.raycasting, game.player
+    for player.x, player.y, player.angle in get_poses(game.map, 300, seed=0):
+        raycasting.ray_cast()
+        depth, proj_height, texture, offset = np.array(raycasting.ray_casting_result).T
+        raycasting.ray_cast_numpy()
+        depth_np, proj_height_np, texture_np, offset_np = np.array(raycasting.ray_casting_result).T
+
+        np.testing.assert_allclose(depth_np, depth, rtol=0, atol=1e-6)
+        np.testing.assert_allclose(offset_np, offset, rtol=0, atol=1e-6)
+        np.testing.assert_array_equal(texture_np, texture)
@@ -0,0 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
+thread_pools = {}
+
+
+def get_thread_pool(name, workers):
+    # pools outlive the game: new_game and the benchmark's runs start games in place, and a pool per
+    # game would leave the old game's idle threads behind each time
+    key = name, workers
+    if key not in thread_pools:
+        thread_pools[key] = ThreadPoolExecutor(workers, thread_name_prefix=name)
+    return thread_pools[key]
@@ -0,0 +1,65 @@
+import math
+import pygame as pg
+from settings import *
+
+
+class View:
+    # resolution of the 3D view and the projection values that follow from it; the view is drawn
+    # at scale times the window size, to the window itself at full scale and stretched over it otherwise
+    def __init__(self, game):
+        self.game = game
+        self.scale = None
+        self.set_scale(RENDER_SCALE)
+
+    def set_scale(self, scale):
+        # True when the resolution changed
+        scale = round(min(max(round(scale / RENDER_SCALE_STEP) * RENDER_SCALE_STEP, RENDER_SCALE_MIN), 1), 2)
+        if scale == self.scale:
+            return False
+        self.scale = scale
+        self.num_rays = int(NUM_RAYS * scale)
+        self.half_num_rays = self.num_rays // 2
+        self.delta_angle = FOV / self.num_rays
+        self.width = self.num_rays * SCALE
+        self.half_width = self.width // 2
+        self.height = int(HEIGHT * scale) // 2 * 2
+        self.half_height = self.height // 2
+        self.res = self.width, self.height
+        self.screen_dist = self.half_width / math.tan(HALF_FOV)
+        screen = self.game.screen
+        self.surface = screen if self.res == screen.get_size() else pg.Surface(self.res, 0, screen)
+        return True
+
+    def present(self):
+        if self.surface is not self.game.screen:
+            pg.transform.scale(self.surface, self.game.screen.get_size(), self.game.screen)
+
+
+class ResolutionController:
+    # moves the render scale towards the one that holds RENDER_TARGET_FRAME_TIME, judged on the
+    # average frame time over RENDER_SCALE_INTERVAL frames
+    def __init__(self, game):
+        self.game = game
+        self.frame_time = 0
+        self.frames = 0
+        self.settling = True
+
+    def update(self):
+        self.frame_time += self.game.delta_time
+        self.frames += 1
+        if self.frames < RENDER_SCALE_INTERVAL:
+            return
+        frame_time = max(self.frame_time / self.frames, 1)
+        self.frame_time = self.frames = 0
+        # the frames after a change refill the scaled surface caches, they do not count
+        if self.settling:
+            self.settling = False
+            return
+
+        if RENDER_TARGET_FRAME_TIME * 0.8 < frame_time < RENDER_TARGET_FRAME_TIME * 1.1:
+            return
+        # the per frame work follows the pixel count, the square of the scale, most closely
+        scale = self.game.view.scale
+        target = scale * math.sqrt(RENDER_TARGET_FRAME_TIME / frame_time)
+        if self.game.set_render_scale(min(max(target, scale - RENDER_SCALE_MAX_CHANGE), scale + RENDER_SCALE_MAX_CHANGE)):
+            self.settling = True
@@ -0,0 +1,196 @@
+import hashlib
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from settings import *
+
+
+def cast_player_npc_rays(grid, ox, oy, tx, ty):
+    # NPC.ray_cast_player_npc for many rays at once: rays leave the player at (ox, oy) towards
+    # npc positions (tx, ty), True where the npc's tile comes before any wall
+    npc_x, npc_y = tx.astype(np.int64), ty.astype(np.int64)
+    x_map, y_map = ox.astype(np.int64), oy.astype(np.int64)
+    ray_angle = np.arctan2(ty - oy, tx - ox)
+    sin_a = np.sin(ray_angle)
+    cos_a = np.cos(ray_angle)
+    steps = np.arange(MAX_DEPTH)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # horizontals
+        y_hor = np.where(sin_a > 0, y_map + 1, y_map - 1e-6)
+        dy = np.where(sin_a > 0, 1, -1)
+        depth_hor = (y_hor - oy) / sin_a
+        x_hor = ox + depth_hor * cos_a
+        delta_depth = dy / sin_a
+        dx = delta_depth * cos_a
+        player_dist_h, wall_dist_h = get_first_event(
+            grid, x_hor[:, None] + steps * dx[:, None], y_hor[:, None] + steps * dy[:, None],
+            npc_x, npc_y, depth_hor, delta_depth
+        )
+
+        # verticals
+        x_vert = np.where(cos_a > 0, x_map + 1, x_map - 1e-6)
+        dx = np.where(cos_a > 0, 1, -1)
+        depth_vert = (x_vert - ox) / cos_a
+        y_vert = oy + depth_vert * sin_a
+        delta_depth = dx / cos_a
+        dy = delta_depth * sin_a
+        player_dist_v, wall_dist_v = get_first_event(
+            grid, x_vert[:, None] + steps * dx[:, None], y_vert[:, None] + steps * dy[:, None],
+            npc_x, npc_y, depth_vert, delta_depth
+        )
+
+    player_dist = np.maximum(player_dist_v, player_dist_h)
+    wall_dist = np.maximum(wall_dist_v, wall_dist_h)
+    same_tile = (x_map == npc_x) & (y_map == npc_y)
+    return same_tile | ((0 < player_dist) & (player_dist < wall_dist)) | (wall_dist == 0)
+
+
+def get_first_event(grid, x, y, npc_x, npc_y, depth, delta_depth):
+    rows, cols = grid.shape
+    tile_x, tile_y = x.astype(np.int64), y.astype(np.int64)
+    # probes outside the map read the empty cell appended after the last row
+    inside = (tile_x.view(np.uint64) < cols) & (tile_y.view(np.uint64) < rows)
+    tiles = np.append(grid.reshape(-1), 0)[np.where(inside, tile_y * cols + tile_x, rows * cols)]
+    wall = tiles > 0
+    npc = (tile_x == npc_x[:, None]) & (tile_y == npc_y[:, None])
+
+    event = wall | npc
+    found = event.any(axis=1)
+    step = event.argmax(axis=1)
+    is_npc = npc[np.arange(len(npc)), step]
+    depth = depth + step * delta_depth
+    return np.where(found & is_npc, depth, 0), np.where(found & ~is_npc, depth, 0)
+
+
+def get_hull_tiles(dx, dy):
+    # tiles, relative to a tile A, whose inside overlaps the convex hull of A and the tile at (dx, dy);
+    # the hull is the segment from (0, 0) to (dx, dy) swept by the unit tile, so a tile at (sx, sy)
+    # overlaps it when the segment passes through the open 2 x 2 box around (sx, sy)
+    sy, sx = np.mgrid[min(0, dy) - 1:max(0, dy) + 2, min(0, dx) - 1:max(0, dx) + 2]
+    low, high = np.full(sx.shape, -math.inf), np.full(sx.shape, math.inf)
+    for s, d in (sx, dx), (sy, dy):
+        if d:
+            # segment parameters inside the box along this axis
+            bounds = (s - 1) / d, (s + 1) / d
+            low, high = np.maximum(low, np.minimum(*bounds)), np.minimum(high, np.maximum(*bounds))
+        else:
+            high = np.where(np.abs(s) < 1, high, -math.inf)
+    overlaps = (low < high) & (low < 1) & (high > 0)
+    return list(zip(sx[overlaps].tolist(), sy[overlaps].tolist()))
+
+
+def get_crossed_lines(dx, dy):
+    # grid lines between a tile A and the tile at (dx, dy) that every segment between them crosses,
+    # as (axis, line, stretch): the line x = line for axis 0, y = line for axis 1, and the rows or
+    # columns of the stretch of it inside the hull
+    lines = []
+    for axis, (d, e) in enumerate(((dx, dy), (dy, dx))):
+        if not d:
+            continue
+        for line in range(1, d + 1) if d > 0 else range(d + 1, 1):
+            # hull points (t d + u, t e + v) with u, v in [0, 1] lying on the line
+            t0, t1 = sorted(((line - 1) / d, line / d))
+            low, high = min(t0 * e, t1 * e), max(t0 * e, t1 * e) + 1
+            lines.append((axis, line, range(math.floor(low), math.ceil(high))))
+    return lines
+
+
+class PotentiallyVisibleSet:
+    # what NPC.ray_cast_player_npc answers for every position in one tile and every position in
+    # another: visible when no wall overlaps the hull of the two tiles, hidden when some grid line
+    # between them is wall all along the stretch the hull crosses; pairs partly hidden behind a
+    # wall corner are left to the exact ray
+    version = 3
+
+    def __init__(self, game_map, radius=PVS_RADIUS):
+        self.map = game_map
+        self.radius = radius
+        self.size = 2 * radius + 1
+        grid = self.map.grid_array
+        self.open_tiles = np.argwhere(grid == 0)[:, ::-1]
+        self.tile_index = np.full(grid.size, -1, dtype=np.int64)
+        self.tile_index[self.open_tiles[:, 1] * self.map.cols + self.open_tiles[:, 0]] = np.arange(len(self.open_tiles))
+        self.tile_index = self.tile_index.tolist()
+
+        self.any_visible = self.all_visible = None
+        self.future = None
+        path = self.get_cache_path()
+        if os.path.isfile(path):
+            with np.load(path) as data:
+                self.set_bits(data['any_visible'], data['all_visible'])
+        else:
+            # built on a background thread, until then every pair falls back to the exact ray
+            executor = ThreadPoolExecutor(1, thread_name_prefix='pvs')
+            self.future = executor.submit(self.load, path)
+            executor.shutdown(wait=False)
+
+    def set_bits(self, any_visible, all_visible):
+        # rows as bytes objects: bit tests stay in plain python
+        self.all_visible = [row.tobytes() for row in all_visible]
+        self.any_visible = [row.tobytes() for row in any_visible]
+
+    def check(self, player_tile, npc_tile):
+        # True or False when every pair of positions in the two tiles agrees, None for the others
+        if self.any_visible is None:
+            return None
+        px, py = player_tile
+        dx, dy = npc_tile[0] - px + self.radius, npc_tile[1] - py + self.radius
+        if not (0 <= dx < self.size and 0 <= dy < self.size):
+            return None
+        row = self.tile_index[py * self.map.cols + px]
+        if row < 0:
+            return None
+        bit = dy * self.size + dx
+        byte, mask = bit >> 3, 0x80 >> (bit & 7)
+        if not self.any_visible[row][byte] & mask:
+            return False
+        if self.all_visible[row][byte] & mask:
+            return True
+        return None
+
+    def get_cache_path(self):
+        key = hashlib.sha1(bytes(self.map.grid))
+        key.update(repr((self.map.rows, self.map.cols, self.radius, MAX_DEPTH, self.version)).encode())
+        return os.path.join(CACHE_DIR, f'pvs_{key.hexdigest()}.npz')
+
+    def load(self, path):
+        any_visible, all_visible = self.build()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.savez_compressed(path, any_visible=any_visible, all_visible=all_visible)
+        self.set_bits(any_visible, all_visible)
+
+    def build(self):
+        # bit (dy, dx) of a tile's row is for the tile at offset (dx - radius, dy - radius); each
+        # offset is decided for every tile of the map at once, on views of the padded wall grid
+        rows, cols = self.map.rows, self.map.cols
+        pad = self.radius + 2
+        # tiles off the map are open, like Map.get_tile has them
+        walls = np.pad(self.map.grid_array != 0, pad)
+        # wall on either side of the unit edge on the line x = column or y = row of each tile
+        edges = walls.copy(), walls.copy()
+        edges[0][:, 1:] |= walls[:, :-1]
+        edges[1][1:] |= walls[:-1]
+
+        def shifted(array, x, y):
+            return array[pad + y:pad + y + rows, pad + x:pad + x + cols]
+
+        tile_x, tile_y = self.open_tiles[:, 0], self.open_tiles[:, 1]
+        num_bytes = (self.size * self.size + 7) // 8
+        any_visible = np.zeros((len(self.open_tiles), num_bytes), dtype=np.uint8)
+        all_visible = np.zeros((len(self.open_tiles), num_bytes), dtype=np.uint8)
+        for dy in range(-self.radius, self.radius + 1):
+            for dx in range(-self.radius, self.radius + 1):
+                target_open = ~shifted(walls, dx, dy)
+                overlapped = np.logical_or.reduce([shifted(walls, sx, sy) for sx, sy in get_hull_tiles(dx, dy)])
+                hidden = np.zeros((rows, cols), dtype=bool)
+                for axis, line, stretch in get_crossed_lines(dx, dy):
+                    hidden |= np.logical_and.reduce(
+                        [shifted(edges[axis], *((line, j) if axis == 0 else (j, line))) for j in stretch])
+
+                bit = (dy + self.radius) * self.size + dx + self.radius
+                byte, mask = bit >> 3, 0x80 >> (bit & 7)
+                any_visible[(target_open & ~hidden)[tile_y, tile_x], byte] |= mask
+                all_visible[(target_open & ~overlapped)[tile_y, tile_x], byte] |= mask
+        return any_visible, all_visible
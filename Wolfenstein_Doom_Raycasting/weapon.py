@@ -3,28 +3,29 @@ from sprite_object import *
 class Weapon(AnimatedSprite):
     def __init__(self, game, path='resources/sprites/weapon/shotgun/0.png', scale=0.4, animation_time=90):
         super().__init__(game=game, path=path, scale=scale, animation_time=animation_time)
-        self.images = deque(
-            [pg.transform.smoothscale(img, (self.image.get_width() * scale, self.image.get_height() * scale))
-             for img in self.images])
-        self.weapon_pos = (HALF_WIDTH - self.images[0].get_width() // 2, HEIGHT - self.images[0].get_height())
+        self.clip = get_clip((self.path, scale), lambda: [
+            pg.transform.smoothscale(img, (self.image.get_width() * scale, self.image.get_height() * scale))
+            for img in assets.get_images(self.path)])
+        self.cursor.play(self.clip)
+        # the clock only moves the frames on while reloading
+        game.animation_clock.remove(self.cursor)
+        self.image = self.cursor.image
+        self.weapon_pos = (HALF_WIDTH - self.image.get_width() // 2, HEIGHT - self.image.get_height())
         self.reloading = False
-        self.num_images = len(self.images)
-        self.frame_counter = 0
         self.damage = 50
 
     def animate_shot(self):
         if self.reloading:
             self.game.player.shot = False
+            self.game.animation_clock.add(self.cursor, self.animation_time)
             if self.animation_trigger:
-                self.images.rotate(-1)
-                self.image = self.images[0]
-                self.frame_counter += 1
-                if self.frame_counter == self.num_images:
+                self.image = self.cursor.image
+                if not self.cursor.frame:
                     self.reloading = False
-                    self.frame_counter = 0
+                    self.game.animation_clock.remove(self.cursor)
 
-    def draw(self):
-        self.game.screen.blit(self.images[0], self.weapon_pos)
+    def draw(self, image=None):
+        self.game.screen.blit(self.image if image is None else image, self.weapon_pos)
 
     def update(self):
         self.check_animation_time()